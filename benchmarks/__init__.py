@@ -0,0 +1 @@
+# Benchmarks: python -m benchmarks.run --help
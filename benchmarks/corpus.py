@@ -0,0 +1,220 @@
+import argparse
+import io
+import os
+import random
+from dataclasses import dataclass, field
+from typing import List
+
+import fitz  # PyMuPDF
+from docx import Document
+
+# Synthetic resumes and JDs shaped like the uploads we get: a header line
+# repeated on every page (so remove_duplicate_lines has work to do), the usual
+# sections, bullet lists, and a share of sections laid out as tables.
+#
+#   python -m benchmarks.corpus --out corpus/ --count 50 --pages 2 --table-density 0.3
+
+FIRST_NAMES = ["Aisha", "Ben", "Carlos", "Deepa", "Elena", "Farid", "Grace", "Hiro", "Ines", "Jonas",
+               "Kavya", "Liam", "Maya", "Nikhil", "Olga", "Pedro", "Quinn", "Rania", "Sven", "Tara"]
+LAST_NAMES = ["Ahmed", "Brown", "Chen", "Dubois", "Evans", "Fernandes", "Garcia", "Hassan", "Iyer",
+              "Jansen", "Khan", "Lopez", "Muller", "Nair", "Okafor", "Patel", "Rossi", "Singh", "Tanaka"]
+SKILLS = ["Python", "Django", "FastAPI", "SQL", "PostgreSQL", "C#", ".NET", "ASP.NET Core", "Java",
+          "Spring Boot", "JavaScript", "TypeScript", "React", "Angular", "Node.js", "AWS", "Azure", "GCP",
+          "Docker", "Kubernetes", "Terraform", "CI/CD", "Jenkins", "Git", "Machine Learning", "Pandas",
+          "Power BI", "Excel", "Agile", "Scrum", "REST APIs", "Microservices", "Redis", "Kafka"]
+TITLES = ["Software Engineer", "Senior Software Engineer", "Backend Developer", "Full Stack Developer",
+          ".NET Developer", "Data Engineer", "DevOps Engineer", "Data Analyst", "Tech Lead"]
+COMPANIES = ["Northwind Systems", "Contoso Ltd", "Fabrikam Inc", "Globex", "Initech", "Umbrella Digital",
+             "Vandelay Industries", "Wayne Analytics", "Stark Solutions", "Tailspin Software"]
+VERBS = ["Built", "Designed", "Led", "Migrated", "Optimized", "Automated", "Maintained", "Delivered",
+         "Refactored", "Mentored", "Implemented", "Reduced"]
+OBJECTS = ["a REST API serving 2M requests/day", "the CI/CD pipeline", "a reporting dashboard",
+           "legacy services to the cloud", "the data ingestion layer", "a team of 4 engineers",
+           "query latency by 40%", "the payments integration", "unit and integration test suites",
+           "infrastructure as code for staging and production", "an internal admin portal"]
+DEGREES = ["B.Tech Computer Science", "B.Sc Information Technology", "M.Sc Data Science", "MCA",
+           "B.E. Electronics", "M.Tech Software Engineering"]
+SCHOOLS = ["State University", "Institute of Technology", "City College", "National University"]
+HOBBIES = ["Chess", "Running", "Photography", "Cooking", "Travel", "Hiking", "Music"]
+
+LINES_PER_PAGE = 48
+
+
+@dataclass
+class Section:
+    heading: str
+    lines: List[str] = field(default_factory=list)  # plain lines or bullets
+    table: List[List[str]] = field(default_factory=list)  # rows of cells; used instead of lines
+
+
+@dataclass
+class SyntheticDocument:
+    name: str
+    header: str  # repeated at the top of every page
+    sections: List[Section]
+    pages: int
+
+    def text(self):
+        """The document's text in reading order, roughly what extraction should return."""
+        out = [self.header]
+        for section in self.sections:
+            out.append(section.heading)
+            out.extend(section.lines)
+            out.extend(" | ".join(row) for row in section.table)
+        return "\n".join(out)
+
+
+def _bullet(rng):
+    return f"{rng.choice(VERBS)} {rng.choice(OBJECTS)} using {rng.choice(SKILLS)} and {rng.choice(SKILLS)}."
+
+
+def _maybe_table(rng, table_density, section, rows):
+    if rng.random() < table_density:
+        section.table = rows
+    else:
+        section.lines = [" - ".join(row) for row in rows]
+    return section
+
+
+def generate_resume(rng, pages=1, table_density=0.3):
+    """A resume filling about `pages` pages; `table_density` is the share of sections laid out as tables."""
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    name = f"{first} {last}"
+    email = f"{first.lower()}.{last.lower()}{rng.randint(1, 9999)}@example.org"
+    header = f"{name} | {email} | +1 555 {rng.randint(100, 999)} {rng.randint(1000, 9999)}"
+    skills = rng.sample(SKILLS, 10)
+
+    sections = [
+        Section("Professional Summary", [
+            f"{rng.choice(TITLES)} with {rng.randint(2, 15)} years of experience in "
+            f"{', '.join(skills[:3])}. {_bullet(rng)}"
+        ]),
+        _maybe_table(rng, table_density, Section("Technical Skills"), [
+            [skills[i], skills[i + 1]] for i in range(0, len(skills), 2)
+        ]),
+    ]
+    experience = Section("Work Experience")
+    sections.append(experience)
+    budget = max(1, pages) * LINES_PER_PAGE - 30
+    while budget > 0:
+        experience.lines.append(
+            f"{rng.choice(TITLES)}, {rng.choice(COMPANIES)} ({rng.randint(2010, 2020)} - {rng.randint(2021, 2025)})"
+        )
+        for _ in range(rng.randint(3, 6)):
+            experience.lines.append(f"• {_bullet(rng)}")
+        budget -= 7
+    sections.append(_maybe_table(rng, table_density, Section("Projects"), [
+        [f"Project {i + 1}", rng.choice(OBJECTS), ", ".join(rng.sample(SKILLS, 3))] for i in range(3)
+    ]))
+    sections.append(_maybe_table(rng, table_density, Section("Education"), [
+        [rng.choice(DEGREES), rng.choice(SCHOOLS), str(rng.randint(2005, 2020))]
+    ]))
+    sections.append(Section("Certifications", [f"• {rng.choice(SKILLS)} Certified Professional"]))
+    sections.append(Section("Hobbies", [", ".join(rng.sample(HOBBIES, 3))]))
+    sections.append(Section("References", ["References available upon request."]))
+    return SyntheticDocument(name=name, header=header, sections=sections, pages=max(1, pages))
+
+
+def generate_jd(rng, title=None, pages=1, table_density=0.0):
+    title = title or rng.choice(TITLES)
+    skills = rng.sample(SKILLS, 8)
+    sections = [
+        Section("About the role", [f"We are hiring a {title} to join {rng.choice(COMPANIES)}."]),
+        Section("Responsibilities", [f"• {_bullet(rng)}" for _ in range(6 * max(1, pages))]),
+        _maybe_table(rng, table_density, Section("Requirements"), [
+            [skill, f"{rng.randint(1, 6)}+ years"] for skill in skills
+        ]),
+    ]
+    return SyntheticDocument(name=title, header=f"Job Description: {title}", sections=sections, pages=max(1, pages))
+
+
+def to_pdf(document):
+    """PDF bytes; tables are drawn as ruled cell grids, the header repeats on every page."""
+    pdf = fitz.open()
+    margin, line_height, width = 50, 14, 595 - 100
+    rows = []  # ("text" | "heading" | "table", payload)
+    for section in document.sections:
+        rows.append(("heading", section.heading))
+        rows.extend(("text", line) for line in section.lines)
+        rows.extend(("table", row) for row in section.table)
+
+    page, y = None, 0
+    for kind, payload in rows:
+        if page is None or y > 842 - margin:
+            page = pdf.new_page(width=595, height=842)
+            page.insert_text((margin, margin), document.header, fontsize=9)
+            y = margin + 2 * line_height
+        if kind == "table":
+            cell_width = width / len(payload)
+            for i, cell in enumerate(payload):
+                x = margin + i * cell_width
+                page.draw_rect(fitz.Rect(x, y - 11, x + cell_width, y + 4), width=0.5)
+                page.insert_text((x + 3, y), cell[:int(cell_width / 5)], fontsize=9)
+        else:
+            page.insert_text((margin, y), payload[:110], fontsize=12 if kind == "heading" else 10)
+        y += line_height
+    data = pdf.tobytes()
+    pdf.close()
+    return data
+
+
+def to_docx(document):
+    """DOCX bytes with real headings, bullet paragraphs, tables and page breaks."""
+    doc = Document()
+    doc.sections[0].header.paragraphs[0].text = document.header
+    lines_on_page = 0
+    for section in document.sections:
+        doc.add_heading(section.heading, level=1)
+        for line in section.lines:
+            if line.startswith("• "):
+                doc.add_paragraph(line[2:], style="List Bullet")
+            else:
+                doc.add_paragraph(line)
+            lines_on_page += 1
+            if lines_on_page >= LINES_PER_PAGE:
+                doc.add_page_break()
+                lines_on_page = 0
+        if section.table:
+            table = doc.add_table(rows=len(section.table), cols=len(section.table[0]))
+            table.style = "Table Grid"
+            for r, row in enumerate(section.table):
+                for c, cell in enumerate(row):
+                    table.cell(r, c).text = cell
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def generate_corpus(count, pages=1, table_density=0.3, formats=("pdf", "docx"), seed=0):
+    """[(filename, bytes, SyntheticDocument)] resumes, cycling through `formats`."""
+    rng = random.Random(seed)
+    files = []
+    for i in range(count):
+        document = generate_resume(rng, pages=pages, table_density=table_density)
+        fmt = formats[i % len(formats)]
+        data = to_pdf(document) if fmt == "pdf" else to_docx(document)
+        files.append((f"resume_{i:04d}.{fmt}", data, document))
+    return files
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic resume/JD corpus to a folder.")
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=1)
+    parser.add_argument("--table-density", type=float, default=0.3)
+    parser.add_argument("--formats", default="pdf,docx")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    formats = tuple(f.strip() for f in args.formats.split(",") if f.strip())
+    for filename, data, _ in generate_corpus(args.count, args.pages, args.table_density, formats, args.seed):
+        with open(os.path.join(args.out, filename), "wb") as f:
+            f.write(data)
+    jd = generate_jd(random.Random(args.seed), pages=args.pages)
+    with open(os.path.join(args.out, "jd.pdf"), "wb") as f:
+        f.write(to_pdf(jd))
+    with open(os.path.join(args.out, "jd.docx"), "wb") as f:
+        f.write(to_docx(jd))
+    print(f"[INFO] Wrote {args.count} resumes and a JD to {args.out}")
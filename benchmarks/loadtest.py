@@ -0,0 +1,351 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import deque
+
+import httpx
+
+# Load generator for sizing instances: starts the app locally (scoring on the
+# fake LLM, with a realistic latency), runs a mix of simulated users against
+# it for a fixed time, and reports per endpoint the throughput, p50/p95/p99
+# latency, error rate and the event-loop lag seen while requests of that
+# endpoint were in flight.
+#
+#   python -m benchmarks.loadtest --mix recruiter=4,browser=20 --duration 120
+#   python -m benchmarks.loadtest --url http://127.0.0.1:8000 ...   # an instance already running
+#
+# Users:
+#   recruiter - uploads a folder of resumes and a JD, ranks, then reads the records
+#   browser   - looks up job titles and ranking records
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAG_INTERVAL_SECONDS = 0.05
+LAG_PATH = "/_loadtest/loop-lag"
+CRITERIA = ["Python", "SQL", ".NET", "AWS", "Docker", "React", "Leadership", "Communication"]
+
+
+# --- Server side ---
+
+def serve(port):
+    """Run the app with a loop-lag sampler; lag is read back through LAG_PATH."""
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    import uvicorn
+
+    import main
+
+    samples = deque(maxlen=500000)  # (unix time, lag seconds)
+
+    async def sample_loop_lag():
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(LAG_INTERVAL_SECONDS)
+            samples.append((time.time(), max(0.0, loop.time() - start - LAG_INTERVAL_SECONDS)))
+
+    @main.app.on_event("startup")
+    async def start_lag_sampler():
+        main.app.state.lag_sampler = asyncio.create_task(sample_loop_lag())
+
+    @main.app.get(LAG_PATH, include_in_schema=False)
+    async def loop_lag(since: float = 0):
+        return [s for s in samples if s[0] >= since]
+
+    uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def start_server(args, workdir):
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'loadtest.db')}",
+        "EXTRACT_CACHE_PATH": os.path.join(workdir, "extract_cache.db"),
+        "SCORER_BACKEND": "fake",
+        "FAKE_LLM_LATENCY_DIST": args.llm_latency_dist,
+        "FAKE_LLM_LATENCY_MS": str(args.llm_latency_ms),
+        "FAKE_LLM_LATENCY_SPREAD": str(args.llm_latency_spread),
+        "FAKE_LLM_429_RATE": str(args.llm_429_rate),
+        "FAKE_LLM_MALFORMED_RATE": str(args.llm_malformed_rate),
+    })
+    env.setdefault("AZURE_OPENAI_TPM", "100000000")
+    log = open(os.path.join(workdir, "server.log"), "w")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.loadtest", "--serve", "--port", str(args.port)],
+        cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    return process, log
+
+
+async def wait_until_ready(client, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            if (await client.get("/job-titles/")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError("Server did not become ready in time")
+
+
+# --- Client side ---
+
+class Recorder:
+    def __init__(self):
+        self.requests = []  # (endpoint, start, end, ok, status)
+
+    async def call(self, client, endpoint, method, url, **kwargs):
+        start = time.time()
+        try:
+            response = await client.request(method, url, **kwargs)
+            ok, status = response.status_code < 400, response.status_code
+        except httpx.HTTPError as e:
+            response, ok, status = None, False, type(e).__name__
+        self.requests.append((endpoint, start, time.time(), ok, status))
+        return response if ok else None
+
+
+async def recruiter(client, recorder, corpus, jd_bytes, args, user_id, deadline, rng):
+    iteration = 0
+    while time.time() < deadline:
+        iteration += 1
+        uploaded_by = f"loadtest-{user_id}"
+        job_title = f"Load Test Role {user_id}-{iteration}"  # a new title each time, so no 30-day skips
+        picked = rng.sample(corpus, min(args.resumes_per_upload, len(corpus)))
+        files = [("files", (name, data, "application/octet-stream")) for name, data in picked]
+        if await recorder.call(client, "/upload-folder/", "POST", "/upload-folder/",
+                               data={"uploaded_by": uploaded_by}, files=files) is None:
+            continue
+        if await recorder.call(client, "/upload-jd/", "POST", "/upload-jd/",
+                               data={"uploaded_by": uploaded_by, "job_title": job_title},
+                               files={"jd_file": ("jd.pdf", jd_bytes, "application/pdf")}) is None:
+            continue
+        criteria = [{"criterion": c} for c in rng.sample(CRITERIA, args.criteria)]
+        await recorder.call(client, "/rank-resumes-dynamic/", "POST", "/rank-resumes-dynamic/", json={
+            "uploaded_by": uploaded_by, "job_title": job_title, "criteria_with_weights": criteria,
+        })
+        await recorder.call(client, "/get-records/", "GET", "/get-records/", params={"job_title": job_title})
+        await asyncio.sleep(rng.expovariate(1 / args.think_time) if args.think_time > 0 else 0)
+
+
+async def browser(client, recorder, corpus, jd_bytes, args, user_id, deadline, rng):
+    while time.time() < deadline:
+        response = await recorder.call(client, "/job-titles/", "GET", "/job-titles/",
+                                       params={"query": "load"} if rng.random() < 0.5 else None)
+        titles = response.json().get("job_titles", []) if response is not None else []
+        job_title = rng.choice(titles) if titles else "load test role"
+        await recorder.call(client, "/get-records/", "GET", "/get-records/", params={"job_title": job_title})
+        await asyncio.sleep(rng.expovariate(1 / args.think_time) if args.think_time > 0 else 0)
+
+
+USERS = {"recruiter": recruiter, "browser": browser}
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        name, _, count = part.partition("=")
+        if name.strip() not in USERS:
+            raise ValueError(f"Unknown user type {name.strip()!r}; available: {', '.join(USERS)}")
+        mix[name.strip()] = int(count or 1)
+    return mix
+
+
+# --- Report ---
+
+def percentile(ordered, q):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def lag_during(intervals, lag_samples):
+    """Lag samples taken while at least one of the intervals was open."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    found, i = [], 0
+    for t, lag in lag_samples:  # sorted by time
+        while i < len(merged) and merged[i][1] < t:
+            i += 1
+        if i < len(merged) and merged[i][0] <= t:
+            found.append(lag)
+    return found
+
+
+def lag_stats(lags):
+    ordered = sorted(lags)
+    if not ordered:
+        return None
+    return {
+        "samples": len(ordered),
+        "p50_ms": percentile(ordered, 0.50) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def build_report(requests, lag_samples, duration):
+    endpoints = {}
+    for endpoint, start, end, ok, status in requests:
+        entry = endpoints.setdefault(endpoint, {"latencies": [], "errors": 0, "statuses": {}, "intervals": []})
+        entry["latencies"].append(end - start)
+        entry["intervals"].append((start, end))
+        entry["errors"] += 0 if ok else 1
+        entry["statuses"][str(status)] = entry["statuses"].get(str(status), 0) + 1
+
+    report = {}
+    for endpoint, entry in sorted(endpoints.items()):
+        ordered = sorted(entry["latencies"])
+        report[endpoint] = {
+            "requests": len(ordered),
+            "throughput_rps": len(ordered) / duration,
+            "error_rate": entry["errors"] / len(ordered),
+            "statuses": entry["statuses"],
+            "p50_ms": percentile(ordered, 0.50) * 1000,
+            "p95_ms": percentile(ordered, 0.95) * 1000,
+            "p99_ms": percentile(ordered, 0.99) * 1000,
+            "max_ms": ordered[-1] * 1000,
+            "loop_lag": lag_stats(lag_during(entry["intervals"], lag_samples)),
+        }
+    return report
+
+
+def print_report(report, overall_lag):
+    print(f"{'endpoint':24s} {'reqs':>6s} {'rps':>7s} {'err%':>6s} {'p50 ms':>9s} {'p95 ms':>9s} "
+          f"{'p99 ms':>9s} {'lag p99':>8s} {'lag max':>8s}")
+    for endpoint, r in report.items():
+        lag = r["loop_lag"] or {}
+        print(f"{endpoint:24s} {r['requests']:6d} {r['throughput_rps']:7.2f} {r['error_rate'] * 100:6.1f} "
+              f"{r['p50_ms']:9.1f} {r['p95_ms']:9.1f} {r['p99_ms']:9.1f} "
+              f"{lag.get('p99_ms', float('nan')):8.1f} {lag.get('max_ms', float('nan')):8.1f}")
+    if overall_lag:
+        print(f"event loop lag overall: p50 {overall_lag['p50_ms']:.1f} ms, p99 {overall_lag['p99_ms']:.1f} ms, "
+              f"max {overall_lag['max_ms']:.1f} ms")
+
+
+async def run(args):
+    from benchmarks.corpus import generate_corpus, generate_jd, to_pdf
+
+    mix = parse_mix(args.mix)
+    formats = tuple(f.strip() for f in args.formats.split(",") if f.strip())
+    corpus = [(name, data) for name, data, _ in generate_corpus(
+        args.corpus_size, args.pages, args.table_density, formats, seed=args.seed,
+    )]
+    jd_bytes = to_pdf(generate_jd(random.Random(args.seed), title="Load Test Role"))
+
+    workdir = tempfile.mkdtemp(prefix="resume-ranker-loadtest-")
+    process = log = None
+    base_url = args.url
+    if base_url is None:
+        process, log = start_server(args, workdir)
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+            await wait_until_ready(client, process)
+            recorder = Recorder()
+            started = time.time()
+            # Every user runs until the same deadline: full load for --duration once all have ramped in
+            deadline = started + args.ramp_up + args.duration
+            print(f"[INFO] Running {sum(mix.values())} users for {args.duration}s against {base_url}"
+                  + (f" after a {args.ramp_up}s ramp-up" if args.ramp_up else ""), file=sys.stderr)
+            users = []
+            try:
+                for kind, count in mix.items():
+                    for i in range(count):
+                        user_id = f"{kind}{i}-{uuid.uuid4().hex[:6]}"
+                        rng = random.Random(f"{args.seed}-{kind}-{i}")
+                        users.append(asyncio.create_task(
+                            USERS[kind](client, recorder, corpus, jd_bytes, args, user_id, deadline, rng)
+                        ))
+                        if args.ramp_up:
+                            await asyncio.sleep(args.ramp_up / max(1, sum(mix.values())))
+                await asyncio.gather(*users)
+            finally:
+                for user in users:  # one user failing (or Ctrl-C) stops the rest
+                    user.cancel()
+            duration = time.time() - started
+
+            lag_samples = []
+            response = await client.get(LAG_PATH, params={"since": started})
+            if response.status_code == 200:
+                lag_samples = sorted(tuple(s) for s in response.json())
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=20)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            log.close()
+
+    report = build_report(recorder.requests, lag_samples, duration)
+    overall_lag = lag_stats([lag for _, lag in lag_samples])
+    print_report(report, overall_lag)
+    result = {
+        "config": {k: v for k, v in vars(args).items() if k != "serve"},
+        "duration_s": duration,
+        "users": mix,
+        "endpoints": report,
+        "loop_lag": overall_lag,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"[INFO] Results written to {args.output}")
+    if process is not None:
+        print(f"[INFO] Server log: {os.path.join(workdir, 'server.log')}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the app with a mix of simulated users.")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--url", help="target a running instance instead of starting one")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--mix", default="recruiter=2,browser=5", help="users per type, e.g. recruiter=4,browser=20")
+    parser.add_argument("--duration", type=float, default=60, help="seconds at full load, after the ramp-up")
+    parser.add_argument("--ramp-up", type=float, default=0, help="seconds over which users are started")
+    parser.add_argument("--think-time", type=float, default=1.0, help="mean pause between user actions, seconds")
+    parser.add_argument("--resumes-per-upload", type=int, default=20)
+    parser.add_argument("--criteria", type=int, default=5)
+    parser.add_argument("--corpus-size", type=int, default=60)
+    parser.add_argument("--pages", type=int, default=2)
+    parser.add_argument("--table-density", type=float, default=0.3)
+    parser.add_argument("--formats", default="pdf,docx")
+    parser.add_argument("--llm-latency-dist", default="lognormal")
+    parser.add_argument("--llm-latency-ms", type=float, default=1500)
+    parser.add_argument("--llm-latency-spread", type=float, default=0.4)
+    parser.add_argument("--llm-429-rate", type=float, default=0.0)
+    parser.add_argument("--llm-malformed-rate", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=600, help="per-request timeout, seconds")
+    parser.add_argument("--output", help="JSON report file")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port)
+        return
+    try:
+        parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
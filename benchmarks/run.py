@@ -0,0 +1,463 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+# Benchmarks for the hot paths, on a synthetic corpus and a throwaway database:
+#
+#   python -m benchmarks.run                       # everything, results/<commit>.json
+#   python -m benchmarks.run --only extract,db --pages 1,4 --baseline benchmarks/results/abc123.json
+#
+# Scoring runs against the fake LLM (fake_openai.py), so end-to-end numbers
+# measure this service, not Azure. Caches are off unless --warm-caches.
+BENCHMARKS = ("extract", "fanout", "dedup", "weighting", "db", "e2e", "rerank")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _configure_environment(workdir, args):
+    """Settings read at import time; must run before the app modules are imported."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["EXTRACT_CACHE_PATH"] = os.path.join(workdir, "extract_cache.db")
+    os.environ["SCORER_BACKEND"] = "fake"
+    os.environ.setdefault("AZURE_OPENAI_TPM", "100000000")  # the fake has no quota unless FAKE_LLM_TPM
+    os.environ.setdefault("FAKE_LLM_LATENCY_MS", str(args.llm_latency_ms))
+    os.environ.setdefault("FAKE_LLM_SEED", "0")
+    if not args.warm_caches:
+        os.environ["EXTRACT_CACHE_MAX_MB"] = "0"
+        os.environ["EVAL_CACHE_MAX_MB"] = "0"
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+
+
+BENCH_CRITERIA = [{"criterion": c} for c in ["Python", "SQL", ".NET", "AWS", "Docker", "React", "Leadership",
+                                             "Communication"]]
+
+_loop = None
+
+
+def run_async(coro):
+    """Run coro on one event loop shared by all benchmarks, like the app's single loop."""
+    global _loop
+    if _loop is None:
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+    return _loop.run_until_complete(coro)
+
+
+def summarize(samples, **extra):
+    ordered = sorted(samples)
+    result = {
+        "n": len(ordered),
+        "mean_s": statistics.fmean(ordered),
+        "p50_s": ordered[len(ordered) // 2],
+        "p95_s": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "min_s": ordered[0],
+        "max_s": ordered[-1],
+    }
+    result.update(extra)
+    return result
+
+
+def measure(fn, repeat, warmup=1):
+    """Wall-clock seconds of `repeat` calls to fn(), after `warmup` untimed calls."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+@contextlib.contextmanager
+def quiet():
+    """The app prints per call; keep that out of the report (the cost of printing is still measured)."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def bench_extract(corpus, page_counts, repeat):
+    from extract import extract_text_from_docx, extract_text_from_pdf
+
+    results = {}
+    for pages in page_counts:
+        for fmt in ("pdf", "docx"):
+            files = corpus[pages][fmt]
+            if fmt == "pdf":
+                samples = measure(lambda: [extract_text_from_pdf(data) for _, data, _ in files], repeat)
+            else:
+                samples = measure(lambda: [extract_text_from_docx(io.BytesIO(data)) for _, data, _ in files], repeat)
+            total_bytes = sum(len(data) for _, data, _ in files)
+            results[f"extract_{fmt}_{pages}p"] = summarize(
+                [s / len(files) for s in samples], per="document", documents=len(files), avg_bytes=total_bytes // len(files),
+            )
+    return results
+
+
+def bench_fanout(repeat, seed=0):
+    """A PDF filling the page budget through the extraction engine; fails unless it is split across workers."""
+    from benchmarks.corpus import generate_resume, to_pdf
+    from extract import PDF_MAX_PAGES, extract_text_from_pdf
+    from extraction_engine import EXTRACT_WORKERS, PDF_FANOUT_MIN_PAGES, ExtractionEngine
+
+    pages = PDF_MAX_PAGES or 2 * PDF_FANOUT_MIN_PAGES
+    data = to_pdf(generate_resume(random.Random(seed), pages=pages))
+    engine = ExtractionEngine(workers=max(2, EXTRACT_WORKERS))
+
+    async def run():
+        samples = []
+        for i in range(repeat + 1):  # the first call starts the workers
+            start = time.perf_counter()
+            text = await engine.extract("large.pdf", data)
+            if i:
+                samples.append(time.perf_counter() - start)
+        return text, samples
+
+    try:
+        text, samples = run_async(run())
+    finally:
+        engine.shutdown()
+    if engine.fanouts != repeat + 1:
+        raise RuntimeError(f"a {pages}-page PDF was not fanned out (PDF_FANOUT_MIN_PAGES={PDF_FANOUT_MIN_PAGES})")
+    if text != extract_text_from_pdf(data):
+        raise RuntimeError("fan-out extraction differs from single-worker extraction")
+    return {"extract_pdf_fanout": summarize(samples, per="document", pages=pages, workers=engine.workers)}
+
+
+def bench_dedup(texts, repeat):
+    from extract import remove_duplicate_lines
+
+    samples = measure(lambda: [remove_duplicate_lines(t) for t in texts], repeat)
+    return {"remove_duplicate_lines": summarize(
+        [s / len(texts) for s in samples], per="document", avg_chars=sum(map(len, texts)) // len(texts),
+    )}
+
+
+def bench_weighting(repeat, criteria_count=8, evaluations=1000):
+    from rank import calculate_weighted_score_manual
+
+    rng = random.Random(0)
+    criteria = [{"criterion": f"Criterion {i}"} for i in range(criteria_count)]
+    results = [
+        {c["criterion"].lower(): {"score": rng.randint(0, 100), "comment": "ok"} for c in criteria}
+        for _ in range(evaluations)
+    ]
+    samples = measure(lambda: [calculate_weighted_score_manual(r, criteria) for r in results], repeat)
+    return {"calculate_weighted_score_manual": summarize(
+        [s / evaluations for s in samples], per="evaluation", criteria=criteria_count,
+    )}
+
+
+def bench_db(texts, repeat):
+    import db
+
+    db.initialize_database()
+    now = datetime.now()
+    job_title = "benchmark engineer"
+    jd_session = str(uuid.uuid4())
+    db.insert_job_description_if_new("bench", job_title, texts[0], jd_session, now)
+    sessions = []
+
+    def insert_batch():
+        session_id = str(uuid.uuid4())
+        sessions.append(session_id)
+        db.insert_resume_rows([
+            {"filename": f"r{i}.pdf", "email": f"c{i}@example.org", "resume_content": text,
+             "uploaded_by": "bench", "session_id": session_id, "created_at": now}
+            for i, text in enumerate(texts)
+        ])
+
+    def insert_rankings():
+        for i in range(len(texts)):
+            db.insert_ranking(f"c{i}@example.org", 50.0, "bench", job_title, now)
+
+    cutoff = now - timedelta(days=30)
+    emails = [f"c{i}@example.org" for i in range(len(texts))] + [f"new{i}@example.org" for i in range(len(texts))]
+    results = {
+        "db_insert_resume_rows": summarize(measure(insert_batch, repeat), per="batch", rows=len(texts)),
+        "db_insert_ranking": summarize(
+            [s / len(texts) for s in measure(insert_rankings, repeat)], per="row",
+        ),
+        "db_get_session_resumes": summarize(
+            measure(lambda: db.get_session_resumes("bench", sessions[-1]), repeat), per="query", rows=len(texts),
+        ),
+        "db_get_recent_rankings": summarize(
+            measure(lambda: db.get_recent_rankings(emails, job_title, cutoff), repeat),
+            per="batch", rows=len(emails),
+        ),
+        "db_get_latest_jd_text": summarize(measure(lambda: db.get_latest_jd_text(job_title), repeat), per="query"),
+        "db_get_rankings_by_job_title": summarize(
+            measure(lambda: db.get_rankings_by_job_title(job_title), repeat), per="query",
+        ),
+        "db_get_job_titles": summarize(measure(lambda: db.get_job_titles("engineer"), repeat), per="query"),
+    }
+    return results
+
+
+@contextlib.asynccontextmanager
+async def app_client(app):
+    """
+    An httpx client calling the app in process through ASGITransport, with the
+    startup/shutdown hooks run by hand: TestClient in starlette 0.27 does not
+    work with httpx 0.28.
+    """
+    import httpx
+
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            yield client
+    finally:
+        await app.router.shutdown()
+
+
+async def _upload_session(client, corpus_files, jd_bytes):
+    """Upload the files and a JD under a new uploader and job title; returns (uploaded_by, job_title, seconds)."""
+    uploaded_by = f"bench-{uuid.uuid4().hex[:8]}"
+    job_title = f"Benchmark Engineer {uploaded_by}"  # new title: no 30-day skips between rounds
+    files = [("files", (name, data, "application/octet-stream")) for name, data, _ in corpus_files]
+
+    start = time.perf_counter()
+    response = await client.post("/upload-folder/", data={"uploaded_by": uploaded_by}, files=files)
+    upload_seconds = time.perf_counter() - start
+    response.raise_for_status()
+
+    response = await client.post(
+        "/upload-jd/", data={"uploaded_by": uploaded_by, "job_title": job_title},
+        files={"jd_file": ("jd.pdf", jd_bytes, "application/pdf")},
+    )
+    response.raise_for_status()
+    return uploaded_by, job_title, upload_seconds
+
+
+async def _rank(client, uploaded_by, job_title, criteria):
+    """(ranked resumes, seconds) of one /rank-resumes-dynamic/ call."""
+    start = time.perf_counter()
+    response = await client.post("/rank-resumes-dynamic/", json={
+        "uploaded_by": uploaded_by, "job_title": job_title, "criteria_with_weights": criteria,
+    })
+    seconds = time.perf_counter() - start
+    response.raise_for_status()
+    return response.json()["ranked_resumes"], seconds
+
+
+async def _run_e2e(app, corpus_files, jd_bytes, repeat, criteria):
+    from scorers import get_scorer
+
+    upload, rank, statuses = [], [], {}
+    async with app_client(app) as client:
+        for i in range(repeat + 1):  # the first round warms up the worker pool
+            uploaded_by, job_title, upload_seconds = await _upload_session(client, corpus_files, jd_bytes)
+            ranked, rank_seconds = await _rank(client, uploaded_by, job_title, criteria)
+            if i == 0:
+                continue
+            upload.append(upload_seconds)
+            rank.append(rank_seconds)
+            for result in ranked:
+                statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+        llm = get_scorer().fake.stats()  # before shutdown closes the scorer
+    return upload, rank, statuses, llm
+
+
+def bench_e2e(corpus_files, jd_bytes, repeat, criteria_count):
+    import main
+
+    criteria = BENCH_CRITERIA[:criteria_count]
+    upload, rank, statuses, llm = run_async(_run_e2e(main.app, corpus_files, jd_bytes, repeat, criteria))
+
+    return {
+        "e2e_upload_folder": summarize(upload, per="request", files=len(corpus_files)),
+        "e2e_rank_resumes_dynamic": summarize(
+            rank, per="request", resumes=len(corpus_files), criteria=len(criteria),
+            llm_latency_ms=float(os.environ["FAKE_LLM_LATENCY_MS"]), statuses=statuses, llm=llm,
+        ),
+    }
+
+
+async def _run_rerank(app, corpus_files, jd_bytes, criteria):
+    from scorers import get_scorer
+
+    rounds = {}
+    async with app_client(app) as client:
+        uploaded_by, job_title, _ = await _upload_session(client, corpus_files, jd_bytes)
+        fake = get_scorer().fake
+        for name, round_criteria in (("first", criteria), ("same", criteria),
+                                     ("added", criteria + BENCH_CRITERIA[len(criteria):len(criteria) + 1])):
+            before = fake.stats()
+            ranked, seconds = await _rank(client, uploaded_by, job_title, round_criteria)
+            after = fake.stats()
+            rounds[name] = {
+                "seconds": seconds,
+                "processed": sum(1 for r in ranked if r["status"] == "processed"),
+                "llm_requests": after["requests"] - before["requests"],
+                "criteria_asked": after["criteria_asked"] - before["criteria_asked"],
+            }
+    return rounds
+
+
+def bench_rerank(corpus_files, jd_bytes, criteria_count):
+    """
+    Rank one upload three times: as is, again with the same criteria, then with one
+    criterion added. Fails unless every resume is evaluated each time and the
+    repeats only ask the LLM about the added criterion.
+    """
+    import main
+    from eval_cache import evaluation_cache
+
+    criteria = BENCH_CRITERIA[:min(criteria_count, len(BENCH_CRITERIA) - 1)]
+    max_bytes = evaluation_cache.max_bytes
+    evaluation_cache.max_bytes = max(max_bytes, 64 * 1024 * 1024)  # the cache is what is being checked
+    try:
+        rounds = run_async(_run_rerank(main.app, corpus_files, jd_bytes, criteria))
+    finally:
+        evaluation_cache.max_bytes = max_bytes
+
+    resumes = len(corpus_files)
+    problems = [f"{name}: {r['processed']} of {resumes} resumes processed"
+                for name, r in rounds.items() if r["processed"] != resumes]
+    if rounds["same"]["llm_requests"]:
+        problems.append(f"same criteria: {rounds['same']['llm_requests']} LLM calls, expected none")
+    if rounds["added"]["criteria_asked"] != resumes or not 0 < rounds["added"]["llm_requests"] <= resumes:
+        problems.append(f"one added criterion: {rounds['added']['llm_requests']} LLM calls asking about "
+                        f"{rounds['added']['criteria_asked']} criteria, expected one per resume")
+    if problems:
+        raise RuntimeError("; ".join(problems))
+    return {
+        f"rerank_{name}": summarize([r["seconds"]], per="request", resumes=resumes,
+                                    llm_requests=r["llm_requests"], criteria_asked=r["criteria_asked"])
+        for name, r in rounds.items()
+    }
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def compare(results, baseline_path):
+    """Print each benchmark's p50 change against an earlier results file."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} ({(baseline.get('commit') or '?')[:10]}):")
+    for name, current in results.items():
+        before = baseline.get("results", {}).get(name)
+        if not before or not before.get("p50_s"):
+            print(f"  {name:36s} new")
+            continue
+        change = (current["p50_s"] - before["p50_s"]) / before["p50_s"] * 100
+        print(f"  {name:36s} {before['p50_s'] * 1000:10.3f} ms -> {current['p50_s'] * 1000:10.3f} ms  {change:+6.1f}%")
+
+
+def write_report(report, output):
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark extraction, scoring, DB and end-to-end paths.")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help=f"comma-separated subset of {BENCHMARKS}")
+    parser.add_argument("--resumes", type=int, default=20, help="documents per format and page count")
+    parser.add_argument("--pages", default="1,3", help="comma-separated page counts")
+    parser.add_argument("--table-density", type=float, default=0.3)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--criteria", type=int, default=5)
+    parser.add_argument("--llm-latency-ms", type=float, default=50)
+    parser.add_argument("--warm-caches", action="store_true", help="keep the extraction and evaluation caches on")
+    parser.add_argument("--output", help="results file (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    selected = [name.strip() for name in args.only.split(",") if name.strip()]
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+    page_counts = [int(p) for p in args.pages.split(",") if p.strip()]
+
+    workdir = tempfile.mkdtemp(prefix="resume-ranker-bench-")
+    _configure_environment(workdir, args)
+    from benchmarks.corpus import generate_corpus, generate_jd, to_pdf
+
+    print(f"[INFO] Generating corpus: {args.resumes} resumes x {page_counts} pages x pdf/docx", file=sys.stderr)
+    corpus = {
+        pages: {
+            fmt: generate_corpus(args.resumes, pages, args.table_density, (fmt,), seed=args.seed + pages)
+            for fmt in ("pdf", "docx")
+        }
+        for pages in page_counts
+    }
+    texts = [document.text() for pages in page_counts for _, _, document in corpus[pages]["pdf"]]
+    jd_bytes = to_pdf(generate_jd(random.Random(args.seed), title="Benchmark Engineer"))
+    mixed = [f for pages in page_counts for fmt in ("pdf", "docx") for f in corpus[pages][fmt]]
+
+    commit, dirty = git_commit()
+    output = args.output or os.path.join(ROOT, "benchmarks", "results", f"{(commit or 'unknown')[:12]}.json")
+    report = {
+        "commit": commit,
+        "dirty": dirty,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": vars(args),
+        "results": {},
+        "failed": {},
+    }
+    results = report["results"]
+    for name in selected:
+        print(f"[INFO] Running {name}", file=sys.stderr)
+        try:
+            with quiet():
+                if name == "extract":
+                    results.update(bench_extract(corpus, page_counts, args.repeat))
+                elif name == "fanout":
+                    results.update(bench_fanout(args.repeat, args.seed))
+                elif name == "dedup":
+                    results.update(bench_dedup(texts, args.repeat))
+                elif name == "weighting":
+                    results.update(bench_weighting(args.repeat))
+                elif name == "db":
+                    results.update(bench_db(texts, args.repeat))
+                elif name == "e2e":
+                    results.update(bench_e2e(mixed, jd_bytes, args.repeat, args.criteria))
+                elif name == "rerank":
+                    results.update(bench_rerank(mixed, jd_bytes, args.criteria))
+        except Exception as e:
+            # Keep what the other benchmarks measured
+            print(f"[ERROR] Benchmark {name} failed: {type(e).__name__}: {e}", file=sys.stderr)
+            report["failed"][name] = f"{type(e).__name__}: {e}"
+        # Written after every benchmark, so an interrupted run still leaves a report
+        write_report(report, output)
+
+    for name, result in results.items():
+        print(f"{name:36s} p50 {result['p50_s'] * 1000:10.3f} ms   p95 {result['p95_s'] * 1000:10.3f} ms"
+              f"   per {result.get('per', 'call')}")
+    print(f"[INFO] Results written to {output}")
+    if args.baseline:
+        compare(results, args.baseline)
+    if report["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
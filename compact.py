@@ -0,0 +1,155 @@
+import os
+import re
+from dataclasses import dataclass, field
+from typing import List
+
+# Resume compaction before LLM scoring: the extracted text is split into
+# sections by their headings, sections that never affect a score (references,
+# hobbies, declarations ...) are dropped along with table/separator noise,
+# and what is left is trimmed to COMPACT_MAX_TOKENS, cutting the least useful
+# sections first.
+COMPACT_MAX_TOKENS = int(os.getenv("COMPACT_MAX_TOKENS", "3000"))  # 0 = no budget
+COMPACT_DROP_SECTIONS = [
+    s.strip() for s in os.getenv(
+        "COMPACT_DROP_SECTIONS", "references,interests,personal,declaration"
+    ).split(",") if s.strip()
+]
+
+# Canonical section -> headings that open it (compared lowercased, without
+# bullets, numbering and trailing colons)
+SECTION_HEADINGS = {
+    "summary": ("summary", "professional summary", "profile", "professional profile", "personal profile",
+                "about me", "objective", "career objective", "career summary", "overview"),
+    "skills": ("skills", "technical skills", "key skills", "core skills", "core competencies",
+               "competencies", "skill set", "skillset", "technologies", "tools", "tech stack",
+               "areas of expertise", "expertise"),
+    "experience": ("experience", "work experience", "professional experience", "employment",
+                   "employment history", "work history", "career history", "relevant experience"),
+    "projects": ("projects", "key projects", "personal projects", "academic projects"),
+    "education": ("education", "academic background", "academic qualifications", "qualifications",
+                  "educational qualifications", "education and training"),
+    "certifications": ("certifications", "certificates", "certification", "licenses",
+                       "licenses and certifications", "courses", "training", "trainings"),
+    "achievements": ("achievements", "awards", "honors", "honours", "accomplishments"),
+    "publications": ("publications", "research", "papers"),
+    "languages": ("languages", "language skills"),
+    "interests": ("interests", "hobbies", "hobbies and interests", "extracurricular activities",
+                  "activities"),
+    # Contact and personal details only: a "personal profile" is a summary (above)
+    "personal": ("personal details", "personal information", "personal data", "contact", "contact details",
+                 "contact information"),
+    "references": ("references", "referees", "references available upon request"),
+    "declaration": ("declaration",),
+}
+_HEADING_TO_SECTION = {h: s for s, headings in SECTION_HEADINGS.items() for h in headings}
+
+# Trimming order when over budget: sections listed first keep their text longest.
+# "header" is whatever precedes the first heading (name, contact details).
+SECTION_PRIORITY = (
+    "header", "skills", "experience", "summary", "certifications", "projects",
+    "education", "achievements", "publications", "languages", "other",
+)
+
+_HEADING_CLEAN = re.compile(r"^[\s\-•*·▪●◦\d.)]*|[\s:–\-]*$")
+_NOISE_LINE = re.compile(r"^[\W_]*$")  # only punctuation, pipes, dashes, bullets
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_text_tokens(text):
+    """Local BPE-like estimate: ~4 characters per token for words, 1 per punctuation mark."""
+    total = 0
+    for token in _TOKEN.findall(text):
+        total += (len(token) + 3) // 4 if token[0].isalnum() or token[0] == "_" else 1
+    return total
+
+
+@dataclass
+class CompactionStats:
+    original_tokens: int = 0
+    compacted_tokens: int = 0
+    dropped_sections: List[str] = field(default_factory=list)
+    noise_lines: int = 0
+    trimmed_sections: List[str] = field(default_factory=list)
+
+    @property
+    def removed_tokens(self):
+        return self.original_tokens - self.compacted_tokens
+
+    def as_dict(self):
+        return {
+            "original_tokens": self.original_tokens,
+            "compacted_tokens": self.compacted_tokens,
+            "removed_tokens": self.removed_tokens,
+            "dropped_sections": self.dropped_sections,
+            "trimmed_sections": self.trimmed_sections,
+            "noise_lines": self.noise_lines,
+        }
+
+
+def _heading_section(line):
+    if len(line) > 60:
+        return None
+    return _HEADING_TO_SECTION.get(_HEADING_CLEAN.sub("", line.lower().replace("&", "and")))
+
+
+def split_sections(text):
+    """[(section, lines)] in document order; repeated headings open a new block of the same section."""
+    sections = [("header", [])]
+    for line in text.split("\n"):
+        section = _heading_section(line.strip())
+        if section is not None:
+            sections.append((section, [line]))
+        else:
+            sections[-1][1].append(line)
+    return [(section, lines) for section, lines in sections if lines]
+
+
+def _priority(section):
+    return SECTION_PRIORITY.index(section) if section in SECTION_PRIORITY else SECTION_PRIORITY.index("other")
+
+
+def compact_resume(text, max_tokens=COMPACT_MAX_TOKENS, drop_sections=COMPACT_DROP_SECTIONS):
+    """Returns (compacted_text, CompactionStats)."""
+    stats = CompactionStats(original_tokens=estimate_text_tokens(text))
+    blocks = []
+    for section, lines in split_sections(text):
+        if section in drop_sections:
+            if section not in stats.dropped_sections:
+                stats.dropped_sections.append(section)
+            continue
+        kept = []
+        for line in lines:
+            line = " ".join(line.split())
+            if _NOISE_LINE.match(line):
+                if line:
+                    stats.noise_lines += 1
+                continue
+            kept.append(line)
+        if kept:
+            blocks.append([section, kept, sum(estimate_text_tokens(l) for l in kept)])
+
+    if max_tokens > 0:
+        remaining = max_tokens
+        # Hand out the budget in priority order, cutting each block at a line boundary
+        for block in sorted(blocks, key=lambda b: _priority(b[0])):
+            section, lines, tokens = block
+            if tokens <= remaining:
+                remaining -= tokens
+                continue
+            kept, used = [], 0
+            for line in lines:
+                line_tokens = estimate_text_tokens(line)
+                if used + line_tokens > remaining:
+                    break
+                kept.append(line)
+                used += line_tokens
+            if section != "header" and len(kept) <= 1:
+                kept, used = [], 0  # a heading with nothing under it
+            block[1], block[2] = kept, used
+            remaining -= used
+            if section not in stats.trimmed_sections:
+                stats.trimmed_sections.append(section)
+
+    compacted = "\n".join(line for _, lines, _ in blocks for line in lines)
+    stats.compacted_tokens = sum(tokens for _, _, tokens in blocks)
+    return compacted, stats
@@ -0,0 +1,701 @@
+import os
+import re
+import time
+from datetime import datetime
+
+from sqlalchemy import bindparam, create_engine, event, text
+
+from metrics import DB_BUCKETS, registry
+
+# One process-wide engine for Resume_Parser.db. Every query the app runs lives
+# here as a module-level statement, so SQLAlchemy compiles each one once and
+# reuses it from its statement cache.
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///Resume_Parser.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_BUSY_TIMEOUT_SECONDS = float(os.getenv("DB_BUSY_TIMEOUT_SECONDS", "30"))
+# Values per IN (...) list; SQLite builds before 3.32 allow 999 bound parameters
+DB_IN_CHUNK_SIZE = int(os.getenv("DB_IN_CHUNK_SIZE", "500"))
+
+# Applied to every new SQLite connection
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",           # readers don't block the writer
+    "PRAGMA synchronous=NORMAL",         # safe with WAL, one fsync per checkpoint
+    f"PRAGMA cache_size=-{int(os.getenv('DB_CACHE_SIZE_KB', '65536'))}",
+    f"PRAGMA mmap_size={int(os.getenv('DB_MMAP_SIZE_BYTES', str(256 * 1024 * 1024)))}",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA foreign_keys=ON",
+)
+
+_engine = None
+
+db_statement_seconds = registry.histogram(
+    "db_statement_seconds", "SQL statement execution time", ("statement",), DB_BUCKETS,
+)
+# Statement label: the verb and the first table it names, e.g. "SELECT TempResumes"
+_TABLE = re.compile(
+    r"\b(?:FROM|INTO|UPDATE|TABLE(?:\s+IF\s+NOT\s+EXISTS)?|INDEX(?:\s+IF\s+NOT\s+EXISTS)?\s+\w+\s+ON)\s+(\w+)",
+    re.IGNORECASE,
+)
+_statement_labels = {}
+
+
+def statement_label(statement):
+    label = _statement_labels.get(statement)
+    if label is None:
+        words = statement.split(None, 1)
+        match = _TABLE.search(statement)
+        label = " ".join(filter(None, [words[0].upper() if words else "", match.group(1) if match else ""]))
+        if len(_statement_labels) < 1000:
+            _statement_labels[statement] = label
+    return label
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["statement_start"] = time.perf_counter()  # statements on one connection run one at a time
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("statement_start", None)
+    if started is not None:
+        db_statement_seconds.observe(time.perf_counter() - started, statement=statement_label(statement))
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        engine = create_engine(
+            DATABASE_URL,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            connect_args={"check_same_thread": False, "timeout": DB_BUSY_TIMEOUT_SECONDS}
+            if DATABASE_URL.startswith("sqlite") else {},
+        )
+        if engine.dialect.name == "sqlite":
+            event.listen(engine, "connect", _set_sqlite_pragmas)
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        _engine = engine
+    return _engine
+
+
+# --- Schema ---
+
+# Schema changes are numbered migrations, applied in order by
+# initialize_database and recorded in SchemaMigrations, so an existing
+# database is upgraded in place on startup. Databases created before
+# migrations existed have no SchemaMigrations table; every step is written to
+# be a no-op on a schema that already has its change, so they simply replay.
+# Never edit a released migration, add a new one.
+
+def add_column(table, column, definition):
+    """Migration step adding a column unless the table already has it."""
+    def step(conn):
+        existing = {row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))}
+        if column not in existing:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {definition}"))
+    return step
+
+
+# (version, description, steps); a step is a statement or a callable taking the connection
+MIGRATIONS = (
+    (1, "Initial tables", (
+        text("""
+            CREATE TABLE IF NOT EXISTS TempResumes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                filename TEXT, email TEXT, resume_content TEXT,
+                uploaded_by TEXT, upload_session_id TEXT, created_at DATETIME
+            )
+        """),
+        text("""
+            CREATE TABLE IF NOT EXISTS TempJobDescription (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                uploaded_by TEXT, job_title TEXT, jd_text TEXT,
+                upload_session_id TEXT, created_at DATETIME
+            )
+        """),
+        text("""
+            CREATE TABLE IF NOT EXISTS CV_Ranking_User_Email (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                email TEXT, weighted_score REAL, uploaded_by TEXT,
+                job_title TEXT, created_at DATETIME
+            )
+        """),
+    )),
+    (2, "Ranking jobs", (
+        text("""
+            CREATE TABLE IF NOT EXISTS RankingJobs (
+                job_id TEXT PRIMARY KEY,
+                uploaded_by TEXT, job_title TEXT, upload_session_id TEXT,
+                criteria_with_weights TEXT, status TEXT,
+                total INTEGER, completed INTEGER DEFAULT 0, error TEXT,
+                created_at DATETIME, updated_at DATETIME
+            )
+        """),
+        text("""
+            CREATE TABLE IF NOT EXISTS RankingJobResults (
+                job_id TEXT NOT NULL, resume_id INTEGER NOT NULL,
+                weighted_score REAL, result TEXT, created_at DATETIME,
+                PRIMARY KEY (job_id, resume_id)
+            )
+        """),
+    )),
+    (3, "Evaluation cache", (
+        text("""
+            CREATE TABLE IF NOT EXISTS EvaluationCache (
+                cache_key TEXT PRIMARY KEY,
+                result TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            )
+        """),
+        text("""
+            CREATE INDEX IF NOT EXISTS ix_evaluation_cache_last_used
+            ON EvaluationCache (last_used_at)
+        """),
+    )),
+    (4, "Per-criterion scores", (
+        text("""
+            CREATE TABLE IF NOT EXISTS CriterionScores (
+                scores_key TEXT NOT NULL,
+                criterion TEXT NOT NULL,
+                result TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL,
+                PRIMARY KEY (scores_key, criterion)
+            )
+        """),
+        text("""
+            CREATE INDEX IF NOT EXISTS ix_criterion_scores_last_used
+            ON CriterionScores (last_used_at)
+        """),
+    )),
+    (5, "Scoring mode of ranking jobs", (
+        add_column("RankingJobs", "scoring_mode", "TEXT DEFAULT 'llm'"),
+    )),
+    # JD lookups compared LOWER(job_title), which no index can serve
+    (6, "Normalized job titles", (
+        add_column("TempJobDescription", "job_title_norm", "TEXT"),
+        text("UPDATE TempJobDescription SET job_title_norm = LOWER(TRIM(job_title)) WHERE job_title_norm IS NULL"),
+    )),
+    # One index per hot lookup, with the selected columns included where they
+    # are small, so the query is answered from the index alone
+    (7, "Indexes for hot queries", (
+        # SELECT_LATEST_JD, SELECT_JOB_TITLES(_LIKE)
+        text("""
+            CREATE INDEX IF NOT EXISTS ix_jd_job_title_norm_created
+            ON TempJobDescription (job_title_norm, created_at)
+        """),
+        # SELECT_LATEST_SESSION
+        text("""
+            CREATE INDEX IF NOT EXISTS ix_resumes_uploaded_by_created
+            ON TempResumes (uploaded_by, created_at, upload_session_id)
+        """),
+        # SELECT_SESSION_RESUMES, COUNT_SESSION_RESUMES
+        text("""
+            CREATE INDEX IF NOT EXISTS ix_resumes_uploaded_by_session
+            ON TempResumes (uploaded_by, upload_session_id)
+        """),
+        # SELECT_RECENT_RANKINGS, one IN-list lookup per ranked session
+        text("""
+            CREATE INDEX IF NOT EXISTS ix_rankings_email_job_title_created
+            ON CV_Ranking_User_Email (email, job_title, created_at)
+        """),
+        # SELECT_RANKINGS_BY_JOB_TITLE
+        text("""
+            CREATE INDEX IF NOT EXISTS ix_rankings_job_title_score
+            ON CV_Ranking_User_Email (job_title, weighted_score)
+        """),
+        # SELECT_UNFINISHED_RANKING_JOBS
+        text("""
+            CREATE INDEX IF NOT EXISTS ix_ranking_jobs_status_created
+            ON RankingJobs (status, created_at)
+        """),
+        # Statistics for the planner on tables that already hold data
+        text("ANALYZE"),
+    )),
+    # A ranking remembers the resume it scored, so re-ranking the same upload is
+    # not mistaken for a repeat application and updates its row instead of adding one
+    (8, "Resume of each ranking", (
+        add_column("CV_Ranking_User_Email", "resume_id", "INTEGER"),
+        text("DROP INDEX IF EXISTS ix_rankings_email_job_title_created"),
+        # SELECT_RECENT_RANKINGS
+        text("""
+            CREATE INDEX IF NOT EXISTS ix_rankings_email_job_title_created_resume
+            ON CV_Ranking_User_Email (email, job_title, created_at, resume_id)
+        """),
+        # UPSERT_RANKING; rows from before this migration have no resume_id and never conflict
+        text("""
+            CREATE UNIQUE INDEX IF NOT EXISTS ux_rankings_resume_job_title
+            ON CV_Ranking_User_Email (resume_id, job_title)
+        """),
+    )),
+)
+
+CREATE_SCHEMA_MIGRATIONS = text("""
+    CREATE TABLE IF NOT EXISTS SchemaMigrations (
+        version INTEGER PRIMARY KEY, description TEXT, applied_at DATETIME
+    )
+""")
+
+SELECT_SCHEMA_VERSIONS = text("SELECT version FROM SchemaMigrations")
+
+INSERT_SCHEMA_VERSION = text("""
+    INSERT OR IGNORE INTO SchemaMigrations (version, description, applied_at)
+    VALUES (:version, :description, :now)
+""")
+
+
+def initialize_database():
+    """Apply the migrations this database has not had yet, each in its own transaction."""
+    engine = get_engine()
+    with engine.begin() as conn:
+        conn.execute(CREATE_SCHEMA_MIGRATIONS)
+        applied = {row[0] for row in conn.execute(SELECT_SCHEMA_VERSIONS)}
+    for version, description, steps in MIGRATIONS:
+        if version in applied:
+            continue
+        with engine.begin() as conn:
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(INSERT_SCHEMA_VERSION, {
+                "version": version, "description": description, "now": datetime.now(),
+            })
+        print(f"[INFO] Applied schema migration {version}: {description}")
+
+
+# --- Statements ---
+
+INSERT_RESUME = text("""
+    INSERT INTO TempResumes (filename, email, resume_content, uploaded_by, upload_session_id, created_at)
+    VALUES (:filename, :email, :resume_content, :uploaded_by, :session_id, :created_at)
+""")
+
+SELECT_LATEST_JD = text("""
+    SELECT jd_text FROM TempJobDescription WHERE job_title_norm = :job_title
+    ORDER BY created_at DESC LIMIT 1
+""")
+
+INSERT_JD = text("""
+    INSERT INTO TempJobDescription (uploaded_by, job_title, job_title_norm, jd_text, upload_session_id, created_at)
+    VALUES (:uploaded_by, :job_title, :job_title, :jd_text, :session_id, :created_at)
+""")
+
+SELECT_LATEST_SESSION = text("""
+    SELECT upload_session_id FROM TempResumes WHERE uploaded_by=:ub
+    ORDER BY created_at DESC LIMIT 1
+""")
+
+SELECT_SESSION_RESUMES = text("""
+    SELECT id, filename, email, resume_content FROM TempResumes
+    WHERE uploaded_by=:ub AND upload_session_id=:sid
+""")
+
+COUNT_SESSION_RESUMES = text("""
+    SELECT COUNT(*) FROM TempResumes
+    WHERE uploaded_by=:ub AND upload_session_id=:sid
+""")
+
+SELECT_RECENT_RANKINGS = text("""
+    SELECT DISTINCT email, resume_id FROM CV_Ranking_User_Email
+    WHERE email IN :emails AND job_title = :job_title AND created_at >= :cutoff
+""").bindparams(bindparam("emails", expanding=True))
+
+# A repeat ranking of the same resume keeps the first ranking's date, which starts the 30-day window
+UPSERT_RANKING = text("""
+    INSERT INTO CV_Ranking_User_Email (email, weighted_score, uploaded_by, job_title, created_at, resume_id)
+    VALUES (:email, :score, :ub, :jt, :dt, :resume_id)
+    ON CONFLICT (resume_id, job_title) DO UPDATE SET weighted_score = excluded.weighted_score
+""")
+
+SELECT_RANKINGS_BY_JOB_TITLE = text("""
+    SELECT id, email, created_at, weighted_score, uploaded_by, job_title
+    FROM CV_Ranking_User_Email
+    WHERE job_title = :job_title
+    ORDER BY weighted_score DESC
+""")
+
+SELECT_JOB_TITLES_LIKE = text("""
+    SELECT DISTINCT job_title_norm
+    FROM TempJobDescription
+    WHERE job_title_norm LIKE :query
+    ORDER BY job_title_norm
+""")
+
+SELECT_JOB_TITLES = text("""
+    SELECT DISTINCT job_title_norm
+    FROM TempJobDescription
+    ORDER BY job_title_norm
+""")
+
+INSERT_RANKING_JOB = text("""
+    INSERT INTO RankingJobs (job_id, uploaded_by, job_title, upload_session_id,
+                             criteria_with_weights, status, total, completed, created_at, updated_at,
+                             scoring_mode)
+    VALUES (:job_id, :ub, :jt, :sid, :criteria, 'queued', :total, 0, :now, :now, :mode)
+""")
+
+SELECT_RANKING_JOB = text("""
+    SELECT job_id, uploaded_by, job_title, upload_session_id, criteria_with_weights,
+           status, total, completed, error, created_at, updated_at, scoring_mode
+    FROM RankingJobs WHERE job_id = :job_id
+""")
+
+SELECT_UNFINISHED_RANKING_JOBS = text("""
+    SELECT job_id FROM RankingJobs WHERE status IN ('queued', 'running')
+    ORDER BY created_at
+""")
+
+UPDATE_RANKING_JOB_STATUS = text("""
+    UPDATE RankingJobs SET status = :status, error = :error, updated_at = :now
+    WHERE job_id = :job_id
+""")
+
+INSERT_RANKING_JOB_RESULT = text("""
+    INSERT OR IGNORE INTO RankingJobResults (job_id, resume_id, weighted_score, result, created_at)
+    VALUES (:job_id, :resume_id, :score, :result, :now)
+""")
+
+UPDATE_RANKING_JOB_PROGRESS = text("""
+    UPDATE RankingJobs
+    SET completed = (SELECT COUNT(*) FROM RankingJobResults WHERE job_id = :job_id), updated_at = :now
+    WHERE job_id = :job_id
+""")
+
+SELECT_RANKING_JOB_RESULT_IDS = text("""
+    SELECT resume_id FROM RankingJobResults WHERE job_id = :job_id
+""")
+
+SELECT_RANKING_JOB_RESULTS = text("""
+    SELECT result FROM RankingJobResults WHERE job_id = :job_id
+    ORDER BY weighted_score DESC
+""")
+
+SELECT_CACHED_EVALUATION = text("""
+    SELECT result FROM EvaluationCache WHERE cache_key = :k AND created_at >= :min_created_at
+""")
+
+TOUCH_CACHED_EVALUATION = text("""
+    UPDATE EvaluationCache SET last_used_at = :now WHERE cache_key = :k
+""")
+
+UPSERT_CACHED_EVALUATION = text("""
+    INSERT OR REPLACE INTO EvaluationCache (cache_key, result, size_bytes, created_at, last_used_at)
+    VALUES (:k, :result, :size, :now, :now)
+""")
+
+DELETE_EXPIRED_EVALUATIONS = text("""
+    DELETE FROM EvaluationCache WHERE created_at < :min_created_at
+""")
+
+SUM_CACHED_EVALUATION_BYTES = text("""
+    SELECT COALESCE(SUM(size_bytes), 0) FROM EvaluationCache
+""")
+
+SELECT_CACHED_EVALUATIONS_LRU = text("""
+    SELECT cache_key, size_bytes FROM EvaluationCache ORDER BY last_used_at ASC
+""")
+
+DELETE_CACHED_EVALUATION = text("""
+    DELETE FROM EvaluationCache WHERE cache_key = :k
+""")
+
+SELECT_CRITERION_SCORES = text("""
+    SELECT criterion, result FROM CriterionScores
+    WHERE scores_key = :k AND created_at >= :min_created_at
+""")
+
+TOUCH_CRITERION_SCORES = text("""
+    UPDATE CriterionScores SET last_used_at = :now WHERE scores_key = :k
+""")
+
+UPSERT_CRITERION_SCORE = text("""
+    INSERT OR REPLACE INTO CriterionScores (scores_key, criterion, result, size_bytes, created_at, last_used_at)
+    VALUES (:k, :criterion, :result, :size, :now, :now)
+""")
+
+DELETE_EXPIRED_CRITERION_SCORES = text("""
+    DELETE FROM CriterionScores WHERE created_at < :min_created_at
+""")
+
+SUM_CRITERION_SCORE_BYTES = text("""
+    SELECT COALESCE(SUM(size_bytes), 0) FROM CriterionScores
+""")
+
+SELECT_CRITERION_SCORES_LRU = text("""
+    SELECT rowid, size_bytes FROM CriterionScores ORDER BY last_used_at ASC
+""")
+
+DELETE_CRITERION_SCORE = text("""
+    DELETE FROM CriterionScores WHERE rowid = :k
+""")
+
+CLEAR_TABLES = (
+    text("DELETE FROM TempResumes"),
+    text("DELETE FROM TempJobDescription"),
+    text("DELETE FROM CV_Ranking_User_Email"),
+    text("DELETE FROM RankingJobResults"),
+    text("DELETE FROM RankingJobs"),
+)
+
+
+# --- Data access ---
+
+def insert_resume_rows(rows):
+    """
+    Insert rows in one executemany transaction. If the batch fails, insert row by
+    row so one bad row does not lose the rest; returns the indexes that failed.
+    """
+    engine = get_engine()
+    try:
+        with engine.begin() as conn:
+            conn.execute(INSERT_RESUME, rows)
+        return set()
+    except Exception as e:
+        # e.orig: the driver error, without the bound parameters (whole resumes)
+        print(f"[WARN] Batch insert of {len(rows)} resumes failed ({getattr(e, 'orig', e)}), retrying row by row")
+    failed = set()
+    for i, row in enumerate(rows):
+        try:
+            with engine.begin() as conn:
+                conn.execute(INSERT_RESUME, row)
+        except Exception as e:
+            print(f"[ERROR] Failed to store {row['filename']}: {getattr(e, 'orig', e)}")
+            failed.add(i)
+    return failed
+
+
+def get_latest_jd_text(job_title_norm):
+    with get_engine().connect() as conn:
+        row = conn.execute(SELECT_LATEST_JD, {"job_title": job_title_norm}).fetchone()
+    return row[0] if row else None
+
+
+def insert_job_description_if_new(uploaded_by, job_title_norm, jd_text, session_id, created_at):
+    """Store a JD unless one already exists for the job title; returns False if it existed."""
+    with get_engine().begin() as conn:
+        if conn.execute(SELECT_LATEST_JD, {"job_title": job_title_norm}).fetchone():
+            return False
+        conn.execute(INSERT_JD, {
+            "uploaded_by": uploaded_by, "job_title": job_title_norm,
+            "jd_text": jd_text, "session_id": session_id, "created_at": created_at,
+        })
+    return True
+
+
+def get_latest_session_id(uploaded_by):
+    with get_engine().connect() as conn:
+        row = conn.execute(SELECT_LATEST_SESSION, {"ub": uploaded_by}).fetchone()
+    return row[0] if row else None
+
+
+def get_session_resumes(uploaded_by, session_id):
+    with get_engine().connect() as conn:
+        return conn.execute(SELECT_SESSION_RESUMES, {"ub": uploaded_by, "sid": session_id}).fetchall()
+
+
+def count_session_resumes(uploaded_by, session_id):
+    with get_engine().connect() as conn:
+        return conn.execute(COUNT_SESSION_RESUMES, {"ub": uploaded_by, "sid": session_id}).scalar()
+
+
+def get_recent_rankings(emails, job_title_norm, cutoff):
+    """
+    {email: {resume ids}} for the emails among `emails` ranked for the job title
+    since cutoff (None for rankings stored before resume ids were), in one query
+    per DB_IN_CHUNK_SIZE emails.
+    """
+    emails = list(emails)
+    found = {}
+    with get_engine().connect() as conn:
+        for i in range(0, len(emails), DB_IN_CHUNK_SIZE):
+            for email, resume_id in conn.execute(SELECT_RECENT_RANKINGS, {
+                "emails": emails[i:i + DB_IN_CHUNK_SIZE], "job_title": job_title_norm, "cutoff": cutoff,
+            }):
+                found.setdefault(email, set()).add(resume_id)
+    return found
+
+
+def _ranking_params(email, weighted_score, uploaded_by, job_title_norm, created_at, resume_id=None):
+    return {
+        "email": email, "score": weighted_score,
+        "ub": uploaded_by, "jt": job_title_norm, "dt": created_at, "resume_id": resume_id,
+    }
+
+
+def insert_ranking(email, weighted_score, uploaded_by, job_title_norm, created_at, resume_id=None):
+    with get_engine().begin() as conn:
+        conn.execute(UPSERT_RANKING, _ranking_params(
+            email, weighted_score, uploaded_by, job_title_norm, created_at, resume_id,
+        ))
+
+
+def get_rankings_by_job_title(job_title_norm):
+    with get_engine().connect() as conn:
+        return conn.execute(SELECT_RANKINGS_BY_JOB_TITLE, {"job_title": job_title_norm}).mappings().all()
+
+
+def get_job_titles(query=None):
+    with get_engine().connect() as conn:
+        if query:
+            result = conn.execute(SELECT_JOB_TITLES_LIKE, {"query": f"%{query.lower()}%"}).fetchall()
+        else:
+            result = conn.execute(SELECT_JOB_TITLES).fetchall()
+    return [row[0] for row in result if row[0]]
+
+
+def create_ranking_job(job_id, uploaded_by, job_title_norm, session_id, criteria_json, total, created_at,
+                       results=(), scoring_mode="llm"):
+    """Create a job, optionally with results already known at submit time as (resume_id, weighted_score, result_json)."""
+    with get_engine().begin() as conn:
+        conn.execute(INSERT_RANKING_JOB, {
+            "job_id": job_id, "ub": uploaded_by, "jt": job_title_norm, "sid": session_id,
+            "criteria": criteria_json, "total": total, "now": created_at, "mode": scoring_mode,
+        })
+        if results:
+            conn.execute(INSERT_RANKING_JOB_RESULT, [
+                {"job_id": job_id, "resume_id": resume_id, "score": score, "result": result, "now": created_at}
+                for resume_id, score, result in results
+            ])
+            conn.execute(UPDATE_RANKING_JOB_PROGRESS, {"job_id": job_id, "now": created_at})
+
+
+def get_ranking_job(job_id):
+    with get_engine().connect() as conn:
+        return conn.execute(SELECT_RANKING_JOB, {"job_id": job_id}).mappings().fetchone()
+
+
+def get_unfinished_ranking_job_ids():
+    with get_engine().connect() as conn:
+        return [row[0] for row in conn.execute(SELECT_UNFINISHED_RANKING_JOBS)]
+
+
+def set_ranking_job_status(job_id, status, error, updated_at):
+    with get_engine().begin() as conn:
+        conn.execute(UPDATE_RANKING_JOB_STATUS, {
+            "job_id": job_id, "status": status, "error": error, "now": updated_at,
+        })
+
+
+def insert_ranking_job_result(job_id, resume_id, weighted_score, result_json, created_at, ranking=None):
+    """
+    Store one resume's result and bump the job's progress in the same transaction,
+    together with its ranking, insert_ranking's arguments as a tuple, if given.
+    """
+    with get_engine().begin() as conn:
+        if ranking is not None:
+            conn.execute(UPSERT_RANKING, _ranking_params(*ranking))
+        conn.execute(INSERT_RANKING_JOB_RESULT, {
+            "job_id": job_id, "resume_id": resume_id, "score": weighted_score,
+            "result": result_json, "now": created_at,
+        })
+        conn.execute(UPDATE_RANKING_JOB_PROGRESS, {"job_id": job_id, "now": created_at})
+
+
+def insert_ranking_job_results(job_id, results, created_at):
+    """Store several results, (resume_id, weighted_score, result_json), in one transaction."""
+    if not results:
+        return
+    with get_engine().begin() as conn:
+        conn.execute(INSERT_RANKING_JOB_RESULT, [
+            {"job_id": job_id, "resume_id": resume_id, "score": score, "result": result, "now": created_at}
+            for resume_id, score, result in results
+        ])
+        conn.execute(UPDATE_RANKING_JOB_PROGRESS, {"job_id": job_id, "now": created_at})
+
+
+def get_ranking_job_result_ids(job_id):
+    with get_engine().connect() as conn:
+        return {row[0] for row in conn.execute(SELECT_RANKING_JOB_RESULT_IDS, {"job_id": job_id})}
+
+
+def get_ranking_job_results(job_id):
+    with get_engine().connect() as conn:
+        return [row[0] for row in conn.execute(SELECT_RANKING_JOB_RESULTS, {"job_id": job_id})]
+
+
+def get_cached_evaluation(cache_key, min_created_at, now):
+    """Cached result JSON newer than min_created_at, or None; marks it as used."""
+    with get_engine().begin() as conn:
+        row = conn.execute(SELECT_CACHED_EVALUATION, {"k": cache_key, "min_created_at": min_created_at}).fetchone()
+        if row is None:
+            return None
+        conn.execute(TOUCH_CACHED_EVALUATION, {"k": cache_key, "now": now})
+    return row[0]
+
+
+def _evict_lru(conn, sum_statement, lru_statement, delete_statement, max_bytes):
+    """Delete least recently used rows until the table's size_bytes total fits max_bytes."""
+    excess = conn.execute(sum_statement).scalar() - max_bytes
+    if excess <= 0:
+        return 0
+    victims = []
+    for key, entry_size in conn.execute(lru_statement):
+        victims.append({"k": key})
+        excess -= entry_size
+        if excess <= 0:
+            break
+    conn.execute(delete_statement, victims)
+    return len(victims)
+
+
+def put_cached_evaluation(cache_key, result_json, now, min_created_at, max_bytes):
+    """Store a result, then drop expired entries and least recently used ones over max_bytes; returns how many were evicted."""
+    size = len(result_json.encode("utf-8"))
+    with get_engine().begin() as conn:
+        conn.execute(UPSERT_CACHED_EVALUATION, {"k": cache_key, "result": result_json, "size": size, "now": now})
+        evicted = conn.execute(DELETE_EXPIRED_EVALUATIONS, {"min_created_at": min_created_at}).rowcount
+        return evicted + _evict_lru(
+            conn, SUM_CACHED_EVALUATION_BYTES, SELECT_CACHED_EVALUATIONS_LRU, DELETE_CACHED_EVALUATION, max_bytes
+        )
+
+
+def get_criterion_scores(scores_key, min_created_at, now):
+    """{criterion: result JSON} stored for a resume/JD pair; marks them as used."""
+    with get_engine().begin() as conn:
+        rows = conn.execute(SELECT_CRITERION_SCORES, {"k": scores_key, "min_created_at": min_created_at}).fetchall()
+        if rows:
+            conn.execute(TOUCH_CRITERION_SCORES, {"k": scores_key, "now": now})
+    return {criterion: result for criterion, result in rows}
+
+
+def put_criterion_scores(scores_key, results, now, min_created_at, max_bytes):
+    """Store {criterion: result JSON} for a resume/JD pair, evicting like put_cached_evaluation."""
+    rows = [
+        {"k": scores_key, "criterion": criterion, "result": result,
+         "size": len(result.encode("utf-8")), "now": now}
+        for criterion, result in results.items()
+    ]
+    with get_engine().begin() as conn:
+        conn.execute(UPSERT_CRITERION_SCORE, rows)
+        evicted = conn.execute(DELETE_EXPIRED_CRITERION_SCORES, {"min_created_at": min_created_at}).rowcount
+        return evicted + _evict_lru(
+            conn, SUM_CRITERION_SCORE_BYTES, SELECT_CRITERION_SCORES_LRU, DELETE_CRITERION_SCORE, max_bytes
+        )
+
+
+def get_all_data():
+    with get_engine().connect() as conn:
+        return {
+            "TempResumes": [dict(row) for row in conn.execute(text("SELECT * FROM TempResumes")).mappings()],
+            "TempJobDescription": [dict(row) for row in conn.execute(text("SELECT * FROM TempJobDescription")).mappings()],
+            "CV_Ranking_User_Email": [dict(row) for row in conn.execute(text("SELECT * FROM CV_Ranking_User_Email")).mappings()],
+        }
+
+
+def clear_all_data():
+    with get_engine().begin() as conn:
+        for statement in CLEAR_TABLES:
+            conn.execute(statement)
@@ -0,0 +1,60 @@
+import os
+from datetime import timedelta
+
+import db
+
+# Duplicate handling before any LLM work: candidates ranked for the job title
+# within RECENT_RANKING_DAYS from another upload are skipped, found with one
+# set-based query for the whole session, and an email uploaded several times
+# in one session is evaluated once, using its most recently stored resume.
+RECENT_RANKING_DAYS = int(os.getenv("RECENT_RANKING_DAYS", "30"))
+# Stored for resumes without an email address; those are never matched to each other
+UNKNOWN_EMAIL = "unknown@example.com"
+
+RECENT_MESSAGE = "This resume has applied for the same position within the last month."
+
+
+def records_ranking(scoring_mode):
+    """Whether a ranking in this mode counts for the RECENT_RANKING_DAYS skip."""
+    # Keyword scores are a triage pass; recording them would block the LLM ranking
+    return scoring_mode != "keyword"
+
+
+def _skipped(resume, message, **extra):
+    return {"filename": resume.filename, "email": resume.email, "status": "skipped", "message": message, **extra}
+
+
+def partition_resumes(resumes, job_title_norm, now):
+    """(resumes to evaluate, [(resume, "skipped" result)]) for a session ranked against job_title_norm."""
+    batch_ids = {}
+    for resume in resumes:
+        if resume.email and resume.email != UNKNOWN_EMAIL:
+            batch_ids.setdefault(resume.email, set()).add(resume.id)
+    emails = set(batch_ids)
+    # Rankings of these very resumes are re-ranks of the session (new criteria, say), not repeat applications
+    ranked = db.get_recent_rankings(emails, job_title_norm, now - timedelta(days=RECENT_RANKING_DAYS))
+    recent = {email for email, resume_ids in ranked.items() if resume_ids - batch_ids[email]}
+
+    latest = {}
+    for resume in resumes:
+        if resume.email in emails and resume.email not in recent:
+            kept = latest.get(resume.email)
+            if kept is None or resume.id > kept.id:
+                latest[resume.email] = resume
+
+    to_evaluate, skipped = [], []
+    for resume in resumes:
+        if resume.email in recent:
+            skipped.append((resume, _skipped(resume, RECENT_MESSAGE)))
+        elif resume.email in latest and latest[resume.email] is not resume:
+            kept = latest[resume.email].filename
+            skipped.append((resume, _skipped(
+                resume, f"Same email as {kept} in this upload; only that resume is evaluated.", duplicate_of=kept,
+            )))
+        else:
+            to_evaluate.append(resume)
+    if skipped:
+        recent_count = sum(1 for resume, _ in skipped if resume.email in recent)
+        print(f"[INFO] Skipped {len(skipped)} of {len(resumes)} resumes: {recent_count} recent applicants, "
+              f"{len(skipped) - recent_count} duplicate uploads")
+    return to_evaluate, skipped
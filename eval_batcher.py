@@ -0,0 +1,129 @@
+import asyncio
+import os
+
+from llm_scheduler import llm_scheduler
+from metrics import registry
+from rank import estimate_batch_tokens, estimate_tokens, is_valid_evaluation
+from scorers import get_scorer
+
+# Batched evaluation: resumes scored against the same JD and criteria are
+# collected for up to LLM_BATCH_LINGER_SECONDS and sent together, so the JD
+# and instructions are paid for once per batch instead of once per resume.
+# A batch closes at LLM_BATCH_MAX_RESUMES resumes or when the next resume
+# would push its estimate past LLM_BATCH_MAX_TOKENS. 1 resume = batching off.
+LLM_BATCH_MAX_RESUMES = int(os.getenv("LLM_BATCH_MAX_RESUMES", "1"))
+LLM_BATCH_MAX_TOKENS = int(os.getenv("LLM_BATCH_MAX_TOKENS", "16000"))
+LLM_BATCH_LINGER_SECONDS = float(os.getenv("LLM_BATCH_LINGER_SECONDS", "0.1"))
+
+
+class _Batch:
+    def __init__(self):
+        self.resume_texts = []
+        self.futures = []
+        self.timer = None
+
+
+class EvaluationBatcher:
+    """
+    Drop-in for Scorer.score that groups concurrent calls into Scorer.score_batch.
+
+    Every candidate's answer is validated on its own; candidates missing from
+    a batch response, or with an invalid entry, and all candidates of a batch
+    whose call failed, are scored again with single-resume calls.
+    """
+
+    def __init__(self, max_resumes=LLM_BATCH_MAX_RESUMES, max_tokens=LLM_BATCH_MAX_TOKENS,
+                 linger=LLM_BATCH_LINGER_SECONDS):
+        self.max_resumes = max_resumes
+        self.max_tokens = max_tokens
+        self.linger = linger
+        self.batched = 0
+        self.fallbacks = 0
+        self._open = {}
+        self._tasks = set()
+
+    async def evaluate(self, resume_text, jd_text, criteria_list):
+        if self.max_resumes <= 1:
+            return await self._single(resume_text, jd_text, criteria_list)
+
+        key = (jd_text, tuple(criteria_list))
+        batch = self._open.get(key)
+        if batch is not None and estimate_batch_tokens(
+            batch.resume_texts + [resume_text], jd_text, criteria_list
+        ) > self.max_tokens:
+            self._close(key)
+            batch = None
+        if batch is None:
+            batch = self._open[key] = _Batch()
+            batch.timer = asyncio.get_running_loop().call_later(self.linger, self._close, key)
+
+        future = asyncio.get_running_loop().create_future()
+        batch.resume_texts.append(resume_text)
+        batch.futures.append(future)
+        if len(batch.resume_texts) >= self.max_resumes:
+            self._close(key)
+        return await future
+
+    def _close(self, key):
+        batch = self._open.pop(key, None)
+        if batch is None:
+            return
+        batch.timer.cancel()
+        jd_text, criteria = key
+        task = asyncio.create_task(self._run(batch, jd_text, list(criteria)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _single(self, resume_text, jd_text, criteria_list):
+        return await llm_scheduler.call(
+            estimate_tokens(resume_text, jd_text, criteria_list),
+            lambda: get_scorer().score(resume_text, jd_text, criteria_list),
+        )
+
+    async def _run(self, batch, jd_text, criteria_list):
+        if len(batch.resume_texts) == 1:
+            results = {}
+        else:
+            resume_texts = {f"c{i + 1}": text for i, text in enumerate(batch.resume_texts)}
+            try:
+                results = await llm_scheduler.call(
+                    estimate_batch_tokens(batch.resume_texts, jd_text, criteria_list),
+                    lambda: get_scorer().score_batch(resume_texts, jd_text, criteria_list),
+                )
+            except Exception as e:
+                print(f"[WARN] Batched evaluation of {len(resume_texts)} resumes failed ({e}), scoring them one by one")
+                results = {}
+            if not isinstance(results, dict):
+                results = {}
+
+        retry = []
+        for i, (text, future) in enumerate(zip(batch.resume_texts, batch.futures)):
+            result = results.get(f"c{i + 1}")
+            if is_valid_evaluation(result, criteria_list):
+                self.batched += 1
+                if not future.done():
+                    future.set_result(result)
+            else:
+                retry.append((text, future))
+        if len(batch.resume_texts) > 1:
+            self.fallbacks += len(retry)
+
+        async def run_single(text, future):
+            try:
+                result = await self._single(text, jd_text, criteria_list)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+                return
+            if not future.done():
+                future.set_result(result)
+
+        await asyncio.gather(*(run_single(text, future) for text, future in retry))
+
+
+evaluation_batcher = EvaluationBatcher()
+
+registry.counter("llm_batch_evaluations_total", "Resumes scored through batched calls", ("result",), fn=lambda: {
+    "batched": evaluation_batcher.batched,
+    "fallback": evaluation_batcher.fallbacks,
+})
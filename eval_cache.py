@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import time
+from typing import Optional
+
+import db
+from metrics import registry
+from prompts import PROMPT_VERSION
+from scorers import get_scorer
+
+# Cache of parsed scorer results in Resume_Parser.db. Keyed by a hash of
+# everything that determines the answer: resume text, JD text, the criteria
+# in order, the prompt version and the scorer (backend and deployment).
+# Entries expire after EVAL_CACHE_TTL_HOURS; the least recently used go once
+# the stored results exceed EVAL_CACHE_MAX_MB.
+#
+# Below that, CriterionScores keeps each criterion's score per resume/JD pair,
+# so a re-rank with one criterion added only asks the model about that one.
+EVAL_CACHE_TTL_HOURS = float(os.getenv("EVAL_CACHE_TTL_HOURS", "168"))
+EVAL_CACHE_MAX_MB = float(os.getenv("EVAL_CACHE_MAX_MB", "64"))
+
+# CriterionScores row holding the summary_comment of the latest call
+SUMMARY_KEY = ""
+
+
+def normalize_criterion(criterion):
+    return criterion.strip(".").lower()
+
+
+class EvaluationCache:
+    def __init__(self, ttl_seconds=EVAL_CACHE_TTL_HOURS * 3600, max_bytes=int(EVAL_CACHE_MAX_MB * 1024 * 1024)):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.criterion_hits = 0
+        self.criterion_misses = 0
+
+    @property
+    def enabled(self):
+        return self.ttl_seconds > 0 and self.max_bytes > 0
+
+    def key_for(self, resume_text, jd_text, criteria_list):
+        payload = json.dumps(
+            [resume_text, jd_text, list(criteria_list), PROMPT_VERSION, get_scorer().name],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        now = time.time()
+        try:
+            cached = db.get_cached_evaluation(key, now - self.ttl_seconds, now)
+        except Exception as e:
+            print(f"[WARN] Evaluation cache lookup failed: {e}")
+            cached = None
+        if cached is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(cached)
+
+    def put(self, key, result):
+        if not self.enabled:
+            return
+        now = time.time()
+        try:
+            self.evictions += db.put_cached_evaluation(
+                key, json.dumps(result), now, now - self.ttl_seconds, self.max_bytes
+            )
+        except Exception as e:
+            print(f"[WARN] Evaluation cache store failed: {e}")
+
+    def scores_key_for(self, resume_text, jd_text):
+        payload = json.dumps(
+            [resume_text, jd_text, PROMPT_VERSION, get_scorer().name], ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_scores(self, scores_key, criteria_list):
+        """
+        Stored scores for the given criteria, keyed by normalized criterion,
+        and the stored summary comment (or None).
+        """
+        stored = {}
+        if self.enabled:
+            now = time.time()
+            try:
+                stored = db.get_criterion_scores(scores_key, now - self.ttl_seconds, now)
+            except Exception as e:
+                print(f"[WARN] Criterion score lookup failed: {e}")
+        scores = {}
+        for criterion in criteria_list:
+            key = normalize_criterion(criterion)
+            if key in stored:
+                scores[key] = json.loads(stored[key])
+        self.criterion_hits += len(scores)
+        self.criterion_misses += len(criteria_list) - len(scores)
+        summary = json.loads(stored[SUMMARY_KEY]) if SUMMARY_KEY in stored else None
+        return scores, summary
+
+    def put_scores(self, scores_key, scores, summary):
+        """Store {normalized criterion: {"score", "comment"}} and the summary of the call that produced them."""
+        if not self.enabled or not scores:
+            return
+        results = {key: json.dumps(value) for key, value in scores.items()}
+        results[SUMMARY_KEY] = json.dumps(summary)
+        now = time.time()
+        try:
+            self.evictions += db.put_criterion_scores(
+                scores_key, results, now, now - self.ttl_seconds, self.max_bytes
+            )
+        except Exception as e:
+            print(f"[WARN] Criterion score store failed: {e}")
+
+    def stats(self):
+        return {
+            "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+            "criterion_hits": self.criterion_hits, "criterion_misses": self.criterion_misses,
+        }
+
+
+evaluation_cache = EvaluationCache()
+
+registry.counter("evaluation_cache_lookups_total", "Evaluation cache lookups", ("level", "result"), fn=lambda: {
+    ("evaluation", "hit"): evaluation_cache.hits,
+    ("evaluation", "miss"): evaluation_cache.misses,
+    ("criterion", "hit"): evaluation_cache.criterion_hits,
+    ("criterion", "miss"): evaluation_cache.criterion_misses,
+})
+registry.counter("evaluation_cache_evictions_total", "Evaluation cache entries evicted for size",
+                 fn=lambda: evaluation_cache.evictions)
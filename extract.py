@@ -1,24 +1,97 @@
 import fitz  # PyMuPDF
 from docx import Document
+from lxml import etree
 import io
+import os
+import zipfile
+
+# Bump whenever extraction output changes so cached results are not reused
+EXTRACTOR_VERSION = "1"
+
+# Budgets for PDF extraction: only the first PDF_MAX_PAGES pages / PDF_MAX_CHARS
+# characters are read (0 = unlimited). Long portfolio PDFs rarely matter past page 30.
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "30"))
+PDF_MAX_CHARS = int(os.getenv("PDF_MAX_CHARS", "100000"))
+
+# Part of the extraction cache key, since budgets change the extracted text
+EXTRACTION_PROFILE = f"{EXTRACTOR_VERSION}:p{PDF_MAX_PAGES}:c{PDF_MAX_CHARS}"
 
 def extract_text_from_pdf_or_docx(file_content: bytes, filename: str) -> str:
     """
     Unified function to extract text from PDF or DOCX based on file extension.
     """
     if filename.lower().endswith(".pdf"):
-        return extract_text_from_pdf(file_content)
+        return extract_text_from_pdf(io.BytesIO(file_content))
     elif filename.lower().endswith(".docx"):
-        return extract_text_from_docx(file_content)
+        return extract_text_from_docx(io.BytesIO(file_content))
     else:
         return ""
 
-def extract_text_from_pdf(file_content: bytes) -> str:
-    doc = fitz.open(stream=file_content, filetype="pdf")
-    text = ""
-    for page in doc:
-        text += page.get_text()
-    return text
+def extract_text_from_path(path: str, filename: str) -> str:
+    """
+    Same as extract_text_from_pdf_or_docx, for an upload already spooled to disk.
+    """
+    if filename.lower().endswith(".pdf"):
+        return extract_text_from_pdf(path)
+    with open(path, "rb") as f:
+        return extract_text_from_pdf_or_docx(f.read(), filename)
+
+def open_pdf(source):
+    # source is a file path, raw bytes or a file-like object
+    if isinstance(source, str):
+        return fitz.open(source, filetype="pdf")
+    return fitz.open(stream=source, filetype="pdf")
+
+def iter_pdf_pages(source, start: int = 0, stop: int = None):
+    """
+    Yield the text of each page in [start, stop), one page at a time.
+    Stopping the iteration early skips the remaining pages entirely.
+    """
+    doc = open_pdf(source)
+    try:
+        yield from _iter_doc_pages(doc, start, stop)
+    finally:
+        doc.close()
+
+def _iter_doc_pages(doc, start, stop):
+    stop = doc.page_count if stop is None else min(stop, doc.page_count)
+    for page_number in range(start, stop):
+        yield doc.load_page(page_number).get_text()
+
+def join_pages(pages, max_chars: int = 0) -> str:
+    """
+    Join page texts in linear time, stopping once max_chars is reached (0 = unlimited).
+    """
+    parts = []
+    total = 0
+    for page_text in pages:
+        if max_chars and total + len(page_text) >= max_chars:
+            parts.append(page_text[:max_chars - total])
+            break
+        parts.append(page_text)
+        total += len(page_text)
+    return "".join(parts)
+
+def extract_text_from_pdf(file_content, max_pages: int = PDF_MAX_PAGES, max_chars: int = PDF_MAX_CHARS) -> str:
+    return join_pages(iter_pdf_pages(file_content, stop=max_pages or None), max_chars)
+
+def extract_pdf_page_range(source, start: int, stop: int, max_chars: int = PDF_MAX_CHARS) -> str:
+    # A range never needs more than the whole document's budget; the caller trims the joined text
+    return join_pages(iter_pdf_pages(source, start, stop), max_chars)
+
+def extract_pdf_unless_large(source, fanout_min_pages: int):
+    """
+    Extract a PDF in one go, or return its (budgeted) page count instead when it
+    has at least fanout_min_pages pages, so the caller can split it into ranges.
+    """
+    doc = open_pdf(source)
+    try:
+        pages = min(doc.page_count, PDF_MAX_PAGES) if PDF_MAX_PAGES else doc.page_count
+        if pages >= fanout_min_pages:
+            return pages
+        return join_pages(_iter_doc_pages(doc, 0, pages), PDF_MAX_CHARS)
+    finally:
+        doc.close()
 
 from docx import Document
 import io
@@ -44,9 +117,126 @@ import io
 #     except Exception as e:
 #         print(f"[ERROR] Failed to extract from docx: {e}")
 #         return None
+# --- Fast DOCX path: stream word/document.xml out of the zip in one pass ---
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+W_BODY, W_P, W_R, W_HYPERLINK = W_NS + "body", W_NS + "p", W_NS + "r", W_NS + "hyperlink"
+W_TBL, W_TR, W_TC, W_TCPR, W_TRPR = W_NS + "tbl", W_NS + "tr", W_NS + "tc", W_NS + "tcPr", W_NS + "trPr"
+W_GRID_SPAN, W_GRID_BEFORE, W_VMERGE = W_NS + "gridSpan", W_NS + "gridBefore", W_NS + "vMerge"
+W_VAL, W_TYPE = W_NS + "val", W_NS + "type"
+W_T, W_BR = W_NS + "t", W_NS + "br"
+# Other run content -> text, as python-docx renders it
+RUN_TEXT = {W_NS + "tab": "\t", W_NS + "ptab": "\t", W_NS + "cr": "\n", W_NS + "noBreakHyphen": "-"}
+OFFICE_DOCUMENT_REL = "/officeDocument"
+
+
+def _main_document_name(zf):
+    rels = etree.fromstring(zf.read("_rels/.rels"))
+    for rel in rels:
+        if rel.get("Type", "").endswith(OFFICE_DOCUMENT_REL):
+            return rel.get("Target").lstrip("/")
+    return "word/document.xml"
+
+
+def _run_text(run, parts):
+    for child in run:
+        tag = child.tag
+        if tag == W_T:
+            parts.append(child.text or "")
+        elif tag == W_BR:
+            parts.append("\n" if child.get(W_TYPE, "textWrapping") == "textWrapping" else "")
+        elif tag in RUN_TEXT:
+            parts.append(RUN_TEXT[tag])
+
+
+def _paragraph_text(p):
+    # Same as python-docx Paragraph.text: direct runs plus runs inside hyperlinks
+    parts = []
+    for child in p:
+        if child.tag == W_R:
+            _run_text(child, parts)
+        elif child.tag == W_HYPERLINK:
+            for run in child:
+                if run.tag == W_R:
+                    _run_text(run, parts)
+    return "".join(parts)
+
+
+def _int_val(parent, tag, default):
+    el = parent.find(tag) if parent is not None else None
+    return int(el.get(W_VAL, default)) if el is not None else default
+
+
+def _row_cells(tr, above):
+    """
+    Cell texts of a table row the way python-docx `row.cells` yields them: a
+    horizontally spanned cell repeats once per grid column, and a vertically
+    merged ("continue") cell repeats the cell above it. `above` maps grid
+    offsets of the previous row to their cell text and is updated in place.
+    """
+    cells = []
+    offsets = {}
+    offset = _int_val(tr.find(W_TRPR), W_GRID_BEFORE, 0)
+    for tc in tr:
+        if tc.tag != W_TC:
+            continue
+        tc_pr = tc.find(W_TCPR)
+        span = _int_val(tc_pr, W_GRID_SPAN, 1)
+        vmerge = tc_pr.find(W_VMERGE) if tc_pr is not None else None
+        if vmerge is not None and vmerge.get(W_VAL, "continue") == "continue":
+            cell_text = above[offset]  # KeyError -> malformed merge, handled by the fallback
+        else:
+            cell_text = "\n".join(_paragraph_text(p) for p in tc if p.tag == W_P)
+        offsets[offset] = cell_text
+        cells.extend([cell_text] * span)
+        offset += span
+    above.clear()
+    above.update(offsets)
+    return cells
+
+
+def extract_text_from_docx_xml(data: bytes) -> str:
+    """
+    Single-pass DOCX extraction with lxml.iterparse, without building the
+    python-docx object model. Produces the same text as the python-docx path:
+    body paragraphs, then top-level table rows, then line-level dedup. (The
+    heading pass of that path never survives its final line dedup, since
+    every heading is already one of the body paragraphs.)
+    """
+    paragraphs = []
+    rows = []
+    merge_state = {}  # grid offset -> cell text of the previous row, per top-level table
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        with zf.open(_main_document_name(zf)) as xml:
+            for _, el in etree.iterparse(xml, events=("end",), tag=(W_P, W_TR)):
+                parent = el.getparent()
+                if el.tag == W_P:
+                    if parent.tag == W_BODY:
+                        paragraphs.append(_paragraph_text(el))
+                        el.clear()
+                        parent.remove(el)
+                elif parent.tag == W_TBL and parent.getparent().tag == W_BODY:
+                    if el.getprevious() is None or el.getprevious().tag != W_TR:
+                        merge_state = {}  # first row of a new table
+                    cells = _row_cells(el, merge_state)
+                    rows.append(" | ".join(c.strip() for c in cells if c.strip()))
+                    # Keep an empty <w:tr/> so the next row can tell it is not the first
+                    el.clear()
+    return remove_duplicate_lines("\n".join(paragraphs + rows))
+
+
 def extract_text_from_docx(file_like):
+    data = file_like.read()
+    try:
+        return extract_text_from_docx_xml(data)
+    except (zipfile.BadZipFile, KeyError, ValueError, etree.XMLSyntaxError) as e:
+        print(f"[WARN] Fast DOCX extraction failed ({e}), falling back to python-docx")
+        return extract_text_from_docx_document(data)
+
+
+def extract_text_from_docx_document(data: bytes):
     try:
-        doc = Document(io.BytesIO(file_like.read()))
+        doc = Document(io.BytesIO(data))
         seen_rows = set()
         text = "\n".join([p.text for p in doc.paragraphs if p.text.strip() != ""])
 
@@ -67,7 +257,6 @@ def extract_text_from_docx(file_like):
                     text += "\n" + header_text
                     seen_rows.add(header_text.lower())
         text = remove_duplicate_lines(text)
-        print(text)
         return text
 
     except Exception as e:
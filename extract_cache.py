@@ -0,0 +1,133 @@
+import hashlib
+import os
+import time
+from typing import Optional
+
+from sqlalchemy import create_engine, text
+
+from extract import EXTRACTION_PROFILE
+
+# Persistent, content-addressed cache of extracted resume text.
+# Keyed by SHA-256 of the uploaded bytes + file type + extractor version/budgets,
+# evicted least-recently-used once the stored text exceeds the size budget.
+EXTRACT_CACHE_PATH = os.getenv("EXTRACT_CACHE_PATH", "Extraction_Cache.db")
+EXTRACT_CACHE_MAX_MB = float(os.getenv("EXTRACT_CACHE_MAX_MB", "256"))
+
+
+def file_kind(file_name):
+    file_name = file_name.lower()
+    if file_name.endswith(".pdf"):
+        return "pdf"
+    elif file_name.endswith(".docx"):
+        return "docx"
+    return None
+
+
+def make_cache_key(digest, kind):
+    return f"{digest}:{kind}:{EXTRACTION_PROFILE}"
+
+
+class ExtractionCache:
+    def __init__(self, path=EXTRACT_CACHE_PATH, max_bytes=int(EXTRACT_CACHE_MAX_MB * 1024 * 1024)):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._engine = None
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def _get_engine(self):
+        if self._engine is None:
+            # Only publish the engine once the table exists, since lookups run
+            # concurrently on executor threads
+            engine = create_engine(
+                f"sqlite:///{self.path}",
+                connect_args={"check_same_thread": False, "timeout": 30},
+            )
+            with engine.begin() as conn:
+                conn.execute(text("""
+                    CREATE TABLE IF NOT EXISTS ExtractionCache (
+                        cache_key TEXT PRIMARY KEY,
+                        extracted_text TEXT NOT NULL,
+                        size_bytes INTEGER NOT NULL,
+                        created_at REAL NOT NULL,
+                        last_used_at REAL NOT NULL
+                    )
+                """))
+                conn.execute(text("""
+                    CREATE INDEX IF NOT EXISTS ix_extraction_cache_last_used
+                    ON ExtractionCache (last_used_at)
+                """))
+            self._engine = engine
+        return self._engine
+
+    def key_for(self, file_name, content_bytes):
+        """Cache key for an upload, or None when the file type is not extractable."""
+        kind = file_kind(file_name)
+        if kind is None:
+            return None
+        return make_cache_key(hashlib.sha256(content_bytes).hexdigest(), kind)
+
+    def key_for_digest(self, file_name, digest):
+        """Cache key for an upload whose SHA-256 was computed while spooling it."""
+        kind = file_kind(file_name)
+        if kind is None:
+            return None
+        return make_cache_key(digest, kind)
+
+    def get(self, key) -> Optional[str]:
+        if not self.enabled or key is None:
+            return None
+        try:
+            with self._get_engine().begin() as conn:
+                row = conn.execute(text(
+                    "SELECT extracted_text FROM ExtractionCache WHERE cache_key = :k"
+                ), {"k": key}).fetchone()
+                if row is None:
+                    return None
+                conn.execute(text(
+                    "UPDATE ExtractionCache SET last_used_at = :now WHERE cache_key = :k"
+                ), {"k": key, "now": time.time()})
+                return row[0]
+        except Exception as e:
+            print(f"[WARN] Extraction cache lookup failed: {e}")
+            return None
+
+    def put(self, key, extracted_text):
+        if not self.enabled or key is None or not extracted_text:
+            return
+        size = len(extracted_text.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        try:
+            with self._get_engine().begin() as conn:
+                conn.execute(text("""
+                    INSERT OR REPLACE INTO ExtractionCache
+                        (cache_key, extracted_text, size_bytes, created_at, last_used_at)
+                    VALUES (:k, :t, :s, :now, :now)
+                """), {"k": key, "t": extracted_text, "s": size, "now": now})
+                self._evict(conn)
+        except Exception as e:
+            print(f"[WARN] Extraction cache store failed: {e}")
+
+    def _evict(self, conn):
+        total = conn.execute(text(
+            "SELECT COALESCE(SUM(size_bytes), 0) FROM ExtractionCache"
+        )).scalar()
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        victims = []
+        for cache_key, size in conn.execute(text(
+            "SELECT cache_key, size_bytes FROM ExtractionCache ORDER BY last_used_at ASC"
+        )):
+            victims.append({"k": cache_key})
+            excess -= size
+            if excess <= 0:
+                break
+        conn.execute(text("DELETE FROM ExtractionCache WHERE cache_key = :k"), victims)
+
+
+extraction_cache = ExtractionCache()
@@ -0,0 +1,194 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from extract import (
+    PDF_MAX_CHARS, PDF_MAX_PAGES, extract_pdf_page_range, extract_pdf_unless_large, extract_text_from_path,
+    extract_text_from_pdf, extract_text_from_pdf_or_docx, join_pages,
+)
+from extract_cache import file_kind
+from metrics import registry
+from tracing import propagate, span
+
+# PDF/DOCX parsing is CPU-bound, so it runs in a process pool of its own,
+# separate from the thread executor used for DB and LLM I/O.
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+EXTRACT_MAX_TASKS_PER_POOL = int(os.getenv("EXTRACT_MAX_TASKS_PER_POOL", "500"))
+EXTRACT_TIMEOUT_SECONDS = float(os.getenv("EXTRACT_TIMEOUT_SECONDS", "60"))
+EXTRACT_START_METHOD = os.getenv("EXTRACT_START_METHOD", "spawn")
+# PDFs with at least this many pages (within the page budget) are split into
+# ranges of PDF_FANOUT_CHUNK_PAGES pages and extracted on several workers (0 = never).
+# Pages are counted after the PDF_MAX_PAGES cap, so a threshold above it never fans out.
+PDF_FANOUT_CHUNK_PAGES = int(os.getenv("PDF_FANOUT_CHUNK_PAGES", "10"))
+PDF_FANOUT_MIN_PAGES = int(os.getenv("PDF_FANOUT_MIN_PAGES", str(2 * PDF_FANOUT_CHUNK_PAGES)))
+if PDF_MAX_PAGES and PDF_FANOUT_MIN_PAGES > PDF_MAX_PAGES:
+    print(f"[WARN] PDF_FANOUT_MIN_PAGES={PDF_FANOUT_MIN_PAGES} is above PDF_MAX_PAGES={PDF_MAX_PAGES}; "
+          f"large PDFs will not be split across workers")
+
+extraction_seconds = registry.histogram(
+    "extraction_seconds", "Text extraction time per file, waiting for a worker included", ("kind", "outcome"),
+)
+
+
+class ExtractionEngine:
+    """
+    Process-pool extraction with worker recycling, per-document timeouts
+    and recovery from crashed workers.
+
+    Recycling rotates to a fresh pool after `max_tasks_per_pool` documents;
+    the retired pool finishes its queued work and its processes exit, which
+    caps memory creep in long-lived PyMuPDF workers.
+    """
+
+    def __init__(self, workers=EXTRACT_WORKERS, max_tasks_per_pool=EXTRACT_MAX_TASKS_PER_POOL,
+                 timeout=EXTRACT_TIMEOUT_SECONDS, start_method=EXTRACT_START_METHOD):
+        self.workers = max(1, workers)
+        self.max_tasks_per_pool = max_tasks_per_pool
+        self.timeout = timeout
+        self.start_method = start_method
+        self.pending = 0
+        self.fanouts = 0
+        self._pool = None
+        self._slots = None
+        self._pool_tasks = 0
+
+    def _get_pool(self):
+        if self._pool is not None and self.max_tasks_per_pool and self._pool_tasks >= self.max_tasks_per_pool:
+            self._retire_pool(self._pool)
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context(self.start_method),
+            )
+            self._pool_tasks = 0
+        self._pool_tasks += 1
+        return self._pool
+
+    def _retire_pool(self, pool):
+        if pool is self._pool:
+            self._pool = None
+        pool.shutdown(wait=False)
+
+    def _kill_pool(self, pool):
+        # A timed-out worker cannot be cancelled, only terminated. Every other
+        # document in flight on this pool then fails with BrokenProcessPool
+        # and is retried on a fresh pool.
+        processes = list((getattr(pool, "_processes", None) or {}).values())
+        self._retire_pool(pool)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    async def run(self, fn, *args):
+        """Run fn(*args) in a worker process; returns None on timeout or repeated crashes."""
+        # Only hand a worker as many documents as it can start right away, so
+        # the timeout measures parse time rather than time spent queued.
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        self.pending += 1
+        try:
+            with span("extraction.wait_for_worker"):
+                await self._slots.acquire()
+            try:
+                with span("extraction." + fn.__name__):
+                    return await self._run_with_retry(propagate(fn), *args)
+            finally:
+                self._slots.release()
+        finally:
+            self.pending -= 1
+
+    async def _run_with_retry(self, fn, *args):
+        pool = self._get_pool()
+        try:
+            return await self._submit(pool, fn, *args)
+        except BrokenProcessPool:
+            print("[WARN] Extraction worker crashed, restarting pool")
+            self._retire_pool(pool)
+
+        # A crash takes down every document in flight on the pool, so retry
+        # each of them once in a single-use pool of its own: a document that
+        # really crashes the parser then only fails itself.
+        isolated = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context(self.start_method))
+        try:
+            return await self._submit(isolated, fn, *args)
+        except BrokenProcessPool:
+            print("[ERROR] Extraction worker crashed twice on the same document")
+            return None
+        finally:
+            isolated.shutdown(wait=False)
+
+    async def _submit(self, pool, fn, *args):
+        try:
+            future = asyncio.wrap_future(pool.submit(fn, *args))
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            print(f"[ERROR] Extraction timed out after {self.timeout}s")
+            self._kill_pool(pool)
+            return None
+
+    async def extract(self, file_name, content_bytes) -> Optional[str]:
+        start = time.perf_counter()
+        text = None
+        try:
+            if file_name.lower().endswith(".pdf"):
+                text = await self._extract_pdf(content_bytes)
+            else:
+                text = await self.run(extract_text_from_pdf_or_docx, content_bytes, file_name)
+        except Exception as e:
+            print(f"[ERROR] Failed to extract {file_name}: {e}")
+        self._observe(file_name, start, text)
+        return text
+
+    async def extract_file(self, file_name, path) -> Optional[str]:
+        # Only the path crosses the process boundary; the worker reads the file itself
+        start = time.perf_counter()
+        text = None
+        try:
+            if file_name.lower().endswith(".pdf"):
+                text = await self._extract_pdf(path)
+            else:
+                text = await self.run(extract_text_from_path, path, file_name)
+        except Exception as e:
+            print(f"[ERROR] Failed to extract {file_name}: {e}")
+        self._observe(file_name, start, text)
+        return text
+
+    @staticmethod
+    def _observe(file_name, start, text):
+        extraction_seconds.observe(
+            time.perf_counter() - start, kind=file_kind(file_name) or "other", outcome="ok" if text else "failed",
+        )
+
+    async def _extract_pdf(self, source):
+        if not PDF_FANOUT_MIN_PAGES or self.workers == 1:
+            return await self.run(extract_text_from_pdf, source)
+        # Ordinary PDFs come back as text in a single round trip; large ones come
+        # back as a page count and are split into page ranges across workers.
+        result = await self.run(extract_pdf_unless_large, source, PDF_FANOUT_MIN_PAGES)
+        if not isinstance(result, int):
+            return result
+        chunk = max(1, PDF_FANOUT_CHUNK_PAGES)
+        self.fanouts += 1
+        parts = await asyncio.gather(*(
+            self.run(extract_pdf_page_range, source, start, min(start + chunk, result), PDF_MAX_CHARS)
+            for start in range(0, result, chunk)
+        ))
+        if any(part is None for part in parts):
+            return None
+        return join_pages(parts, PDF_MAX_CHARS)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._retire_pool(self._pool)
+
+
+extraction_engine = ExtractionEngine()
+
+registry.gauge("extraction_pending", "Documents waiting for or in an extraction worker",
+               fn=lambda: extraction_engine.pending)
+registry.counter("extraction_pdf_fanouts_total", "PDFs split into page ranges across workers",
+                 fn=lambda: extraction_engine.fanouts)
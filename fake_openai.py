@@ -0,0 +1,243 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import time
+from collections import deque
+
+import httpx
+
+# Local stand-in for an Azure OpenAI chat-completions deployment, to measure
+# concurrency, rate control and backoff without a network or a quota. It
+# answers the function-call protocol rank.py uses: the arguments follow the
+# function's JSON schema, with scores derived from a hash of the request so
+# the same prompt always gets the same answer.
+#
+# Use it in process (FakeAzureTransport, SCORER_BACKEND=fake) or as a small
+# HTTP server pointed at by AZURE_OPENAI_ENDPOINT:
+#   python fake_openai.py --port 8001
+FAKE_LLM_LATENCY_DIST = os.getenv("FAKE_LLM_LATENCY_DIST", "lognormal")  # fixed, uniform, lognormal, exponential
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "800"))  # median (lognormal) or mean
+FAKE_LLM_LATENCY_SPREAD = float(os.getenv("FAKE_LLM_LATENCY_SPREAD", "0.5"))  # sigma (lognormal), +/- fraction (uniform)
+FAKE_LLM_MS_PER_1K_TOKENS = float(os.getenv("FAKE_LLM_MS_PER_1K_TOKENS", "0"))  # added per 1000 prompt tokens
+FAKE_LLM_429_RATE = float(os.getenv("FAKE_LLM_429_RATE", "0"))
+FAKE_LLM_MALFORMED_RATE = float(os.getenv("FAKE_LLM_MALFORMED_RATE", "0"))
+FAKE_LLM_RETRY_AFTER_SECONDS = float(os.getenv("FAKE_LLM_RETRY_AFTER_SECONDS", "1"))
+FAKE_LLM_TPM = int(os.getenv("FAKE_LLM_TPM", "0"))  # enforced tokens-per-minute quota, 0 = none
+FAKE_LLM_SEED = os.getenv("FAKE_LLM_SEED")
+
+CHARS_PER_TOKEN = 4
+
+
+def _stable_int(*parts):
+    digest = hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+    return int(digest[:8], 16)
+
+
+def fake_arguments(schema, seed, path=()):
+    """A value matching a JSON schema, fixed for a given seed and property path."""
+    kind = schema.get("type")
+    if kind == "object":
+        return {
+            name: fake_arguments(prop, seed, path + (name,))
+            for name, prop in schema.get("properties", {}).items()
+        }
+    if kind == "integer":
+        low, high = schema.get("minimum", 0), schema.get("maximum", 100)
+        return low + _stable_int(seed, *path) % (high - low + 1)
+    if kind == "number":
+        return round((_stable_int(seed, *path) % 10001) / 100, 2)
+    if kind == "boolean":
+        return _stable_int(seed, *path) % 2 == 0
+    if kind == "array":
+        return []
+    return f"Fake {' / '.join(path) or 'answer'}."
+
+
+def criteria_asked(parameters):
+    """Criteria a scoring function schema asks about, summed over the candidates of a batch."""
+    count = 0
+    for name, schema in (parameters.get("properties") or {}).items():
+        nested = schema.get("properties") if isinstance(schema, dict) else None
+        if nested and "summary_comment" in nested:  # one candidate of evaluate_resumes
+            count += len(nested) - 1
+        elif name != "summary_comment":
+            count += 1
+    return count
+
+
+class FakeChatCompletions:
+    """Produces chat-completion responses, 429s and malformed arguments at the configured rates."""
+
+    def __init__(self, latency_dist=FAKE_LLM_LATENCY_DIST, latency_ms=FAKE_LLM_LATENCY_MS,
+                 latency_spread=FAKE_LLM_LATENCY_SPREAD, ms_per_1k_tokens=FAKE_LLM_MS_PER_1K_TOKENS,
+                 rate_limit_rate=FAKE_LLM_429_RATE, malformed_rate=FAKE_LLM_MALFORMED_RATE,
+                 retry_after=FAKE_LLM_RETRY_AFTER_SECONDS, tpm=FAKE_LLM_TPM, seed=FAKE_LLM_SEED):
+        if latency_dist not in ("fixed", "uniform", "lognormal", "exponential"):
+            raise ValueError(f"Unknown latency distribution {latency_dist!r}")
+        self.latency_dist = latency_dist
+        self.latency_ms = latency_ms
+        self.latency_spread = latency_spread
+        self.ms_per_1k_tokens = ms_per_1k_tokens
+        self.rate_limit_rate = rate_limit_rate
+        self.malformed_rate = malformed_rate
+        self.retry_after = retry_after
+        self.tpm = tpm
+        self.random = random.Random(seed)
+        self._window = deque()  # (time, tokens) admitted in the last minute, for the TPM quota
+        self.requests = 0
+        self.rate_limited = 0
+        self.malformed = 0
+        self.criteria_asked = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "rate_limited": self.rate_limited,
+            "malformed": self.malformed,
+            "criteria_asked": self.criteria_asked,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+        }
+
+    def latency(self, prompt_tokens=0):
+        """Seconds one response takes, drawn from the configured distribution."""
+        ms = self.latency_ms
+        if self.latency_dist == "uniform":
+            ms *= 1 + self.random.uniform(-self.latency_spread, self.latency_spread)
+        elif self.latency_dist == "lognormal":
+            ms *= math.exp(self.random.gauss(0, self.latency_spread))
+        elif self.latency_dist == "exponential":
+            ms = self.random.expovariate(1 / ms) if ms > 0 else 0
+        ms += self.ms_per_1k_tokens * prompt_tokens / 1000
+        return max(0.0, ms) / 1000
+
+    def _quota_wait(self, tokens):
+        """Seconds until `tokens` fit in the TPM quota (0 = admitted now and counted)."""
+        now = time.monotonic()
+        while self._window and self._window[0][0] <= now - 60:
+            self._window.popleft()
+        used = sum(t for _, t in self._window)
+        if used and used + tokens > self.tpm:
+            return self._window[0][0] + 60 - now
+        self._window.append((now, tokens))
+        return 0.0
+
+    def _rate_limited(self, retry_after):
+        self.rate_limited += 1
+        retry_after = max(retry_after, 0.001)
+        headers = {
+            "retry-after": str(math.ceil(retry_after)),
+            "retry-after-ms": str(int(retry_after * 1000)),
+        }
+        payload = {"error": {
+            "code": "429",
+            "message": f"Rate limit exceeded (fake). Please retry after {math.ceil(retry_after)} seconds.",
+        }}
+        return 429, headers, payload
+
+    async def respond(self, body):
+        """(status, headers, JSON payload) for a chat-completions request body."""
+        self.requests += 1
+        messages = body.get("messages", [])
+        prompt = json.dumps(messages, ensure_ascii=False)
+        functions = body.get("functions") or []
+        prompt_tokens = (len(prompt) + len(json.dumps(functions))) // CHARS_PER_TOKEN
+
+        if self.rate_limit_rate and self.random.random() < self.rate_limit_rate:
+            return self._rate_limited(self.retry_after)
+        if self.tpm:
+            wait = self._quota_wait(prompt_tokens)
+            if wait:
+                return self._rate_limited(wait)
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency(prompt_tokens))
+        finally:
+            self.in_flight -= 1
+
+        message = {"role": "assistant", "content": None}
+        if functions:
+            function = functions[0]
+            call = body.get("function_call")
+            if isinstance(call, dict):
+                function = next((f for f in functions if f.get("name") == call.get("name")), function)
+            self.criteria_asked += criteria_asked(function.get("parameters", {}))
+            arguments = json.dumps(fake_arguments(function.get("parameters", {}), prompt))
+            if self.malformed_rate and self.random.random() < self.malformed_rate:
+                self.malformed += 1
+                arguments = arguments[: len(arguments) // 2]  # cut off mid-object, like a truncated answer
+            message["function_call"] = {"name": function.get("name"), "arguments": arguments}
+            completion = arguments
+        else:
+            completion = "Fake answer."
+            message["content"] = completion
+        completion_tokens = len(completion) // CHARS_PER_TOKEN
+
+        return 200, {}, {
+            "id": f"chatcmpl-fake-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model") or "fake",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": message}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": 0},
+            },
+        }
+
+
+class FakeAzureTransport(httpx.AsyncBaseTransport):
+    """httpx transport answering every request with FakeChatCompletions, no network involved."""
+
+    def __init__(self, fake=None):
+        self.fake = fake or FakeChatCompletions()
+
+    async def handle_async_request(self, request):
+        await request.aread()
+        try:
+            body = json.loads(request.content or b"{}")
+        except ValueError:
+            return httpx.Response(400, json={"error": {"code": "400", "message": "Invalid JSON body"}},
+                                  request=request)
+        status, headers, payload = await self.fake.respond(body)
+        return httpx.Response(status, headers=headers, json=payload, request=request)
+
+
+def create_app(fake=None):
+    """FastAPI app serving the Azure chat-completions route with FakeChatCompletions."""
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse
+
+    fake = fake or FakeChatCompletions()
+    app = FastAPI(title="Fake Azure OpenAI")
+
+    @app.post("/openai/deployments/{deployment}/chat/completions")
+    async def chat_completions(deployment: str, request: Request):
+        status, headers, payload = await fake.respond(await request.json())
+        return JSONResponse(content=payload, status_code=status, headers=headers)
+
+    @app.get("/stats")
+    async def stats():
+        return fake.stats()
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve a fake Azure OpenAI chat-completions endpoint.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    args = parser.parse_args()
+    uvicorn.run(create_app(), host=args.host, port=args.port)
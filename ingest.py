@@ -0,0 +1,155 @@
+import hashlib
+import os
+import tempfile
+from collections import deque
+from dataclasses import dataclass
+
+try:
+    import python_multipart as multipart
+    from python_multipart.multipart import parse_options_header
+except ModuleNotFoundError:  # older python-multipart releases
+    import multipart
+    from multipart.multipart import parse_options_header
+
+# Form fields are small (uploaded_by, job_title ...); anything bigger is rejected
+MAX_FIELD_BYTES = 64 * 1024
+
+
+class MultipartError(ValueError):
+    pass
+
+
+@dataclass
+class SpooledUpload:
+    field_name: str
+    filename: str
+    path: str
+    size: int
+    sha256: str
+
+
+class _PartState:
+    def __init__(self):
+        self.headers = {}
+        self.field_name = ""
+        self.filename = None
+        self.data = bytearray()
+        self.file = None
+        self.path = None
+        self.size = 0
+        self.digest = None
+
+
+def _decode(value, charset="utf-8"):
+    try:
+        return value.decode(charset)
+    except (UnicodeDecodeError, LookupError):
+        return value.decode("latin-1")
+
+
+async def iter_multipart(request, spool_dir):
+    """
+    Parse a multipart/form-data body as it arrives.
+
+    Yields `(name, value)` tuples for plain form fields and a `SpooledUpload`
+    for every file part, in body order. File parts are written straight to
+    `spool_dir` and hashed on the way, so no file is ever held in memory.
+    """
+    _, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if not boundary:
+        raise MultipartError("Missing boundary in multipart body.")
+
+    ready = deque()
+    part = _PartState()
+    header_field = bytearray()
+    header_value = bytearray()
+
+    def on_part_begin():
+        nonlocal part
+        part = _PartState()
+
+    def on_header_field(data, start, end):
+        header_field.extend(data[start:end])
+
+    def on_header_value(data, start, end):
+        header_value.extend(data[start:end])
+
+    def on_header_end():
+        part.headers[bytes(header_field).lower()] = bytes(header_value)
+        header_field.clear()
+        header_value.clear()
+
+    def on_headers_finished():
+        _, options = parse_options_header(part.headers.get(b"content-disposition", b""))
+        if b"name" not in options:
+            raise MultipartError('The Content-Disposition header field "name" must be provided.')
+        part.field_name = _decode(options[b"name"])
+        if b"filename" in options:
+            part.filename = _decode(options[b"filename"])
+            part.file = tempfile.NamedTemporaryFile(dir=spool_dir, delete=False)
+            part.path = part.file.name
+            part.digest = hashlib.sha256()
+
+    def on_part_data(data, start, end):
+        chunk = data[start:end]
+        if part.file is not None:
+            part.file.write(chunk)
+            part.digest.update(chunk)
+            part.size += len(chunk)
+        else:
+            part.data.extend(chunk)
+            if len(part.data) > MAX_FIELD_BYTES:
+                raise MultipartError(f"Form field '{part.field_name}' is too large.")
+
+    def on_part_end():
+        if part.file is not None:
+            part.file.close()
+            ready.append(SpooledUpload(
+                field_name=part.field_name, filename=part.filename, path=part.path,
+                size=part.size, sha256=part.digest.hexdigest(),
+            ))
+        else:
+            ready.append((part.field_name, _decode(bytes(part.data))))
+
+    parser = multipart.MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+    })
+
+    try:
+        async for chunk in request.stream():
+            error = None
+            if chunk:
+                try:
+                    parser.write(chunk)
+                except multipart.exceptions.ParseError as e:
+                    error = MultipartError(str(e))
+                except MultipartError as e:
+                    error = e
+            # Parts completed earlier in a chunk that turns out malformed are still
+            # handed over, so the caller can account for them before the error
+            while ready:
+                yield ready.popleft()
+            if error is not None:
+                raise error
+        parser.finalize()
+        while ready:
+            yield ready.popleft()
+    finally:
+        # Close a part that was cut off mid-body; its file stays in spool_dir
+        # and is removed with it.
+        if part.file is not None and not part.file.closed:
+            part.file.close()
+
+
+def remove_spooled(upload):
+    try:
+        os.remove(upload.path)
+    except OSError:
+        pass
@@ -0,0 +1,153 @@
+import asyncio
+import json
+import os
+import uuid
+from datetime import datetime
+
+import db
+from dedup import partition_resumes, records_ranking
+from tracing import current_trace_id, span
+
+# Ranking runs as a background job so a long run no longer depends on one HTTP
+# request staying open. Every finished resume is written to RankingJobResults
+# straight away; after a restart, unfinished jobs pick up with the resumes
+# that have no result yet.
+RANK_JOB_CONCURRENCY = int(os.getenv("RANK_JOB_CONCURRENCY", "10"))
+RANK_JOB_MAX_ACTIVE = int(os.getenv("RANK_JOB_MAX_ACTIVE", "2"))
+
+
+class RankingJobs:
+    """
+    Runs ranking jobs on the event loop.
+
+    `evaluate` is the coroutine that scores a single resume, called as
+    evaluate(filename, email, resume_text, jd_text, criteria_with_weights,
+    uploaded_by, job_title_norm, scoring_mode, resume_id) and returning the result dict.
+    """
+
+    def __init__(self, evaluate, executor, concurrency=RANK_JOB_CONCURRENCY, max_active=RANK_JOB_MAX_ACTIVE):
+        self.evaluate = evaluate
+        self.executor = executor
+        self.concurrency = max(1, concurrency)
+        self.max_active = max(1, max_active)
+        self._tasks = {}
+        self._active = None
+
+    async def _db(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, fn, *args)
+
+    async def submit(self, uploaded_by, job_title_norm, session_id, criteria_with_weights, total, results=(),
+                     scoring_mode="llm"):
+        """`results`: (resume_id, result dict) pairs settled up front, e.g. resumes filtered out by the shortlist."""
+        job_id = str(uuid.uuid4())
+        await self._db(
+            db.create_ranking_job, job_id, uploaded_by, job_title_norm, session_id,
+            json.dumps(criteria_with_weights), total, datetime.now(),
+            [(resume_id, result.get("weighted_score"), json.dumps(result)) for resume_id, result in results],
+            scoring_mode,
+        )
+        self._start(job_id)
+        return job_id
+
+    async def resume_unfinished(self):
+        for job_id in await self._db(db.get_unfinished_ranking_job_ids):
+            print(f"[INFO] Resuming ranking job {job_id}")
+            self._start(job_id)
+
+    async def status(self, job_id):
+        """The job row plus the results stored so far, best score first; None if unknown."""
+        job = await self._db(db.get_ranking_job, job_id)
+        if job is None:
+            return None
+        results = await self._db(db.get_ranking_job_results, job_id)
+        return {
+            "job_id": job["job_id"],
+            "status": job["status"],
+            "uploaded_by": job["uploaded_by"],
+            "job_title": job["job_title"],
+            "scoring_mode": job["scoring_mode"],
+            "total": job["total"],
+            "completed": job["completed"],
+            "error": job["error"],
+            "created_at": str(job["created_at"]),
+            "updated_at": str(job["updated_at"]),
+            "ranked_resumes": [json.loads(r) for r in results],
+        }
+
+    def _start(self, job_id):
+        if job_id in self._tasks:
+            return
+        # Keep a reference, the loop only holds tasks weakly
+        task = asyncio.create_task(self._run(job_id, current_trace_id()))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    async def _run(self, job_id, submitted_trace_id=None):
+        if self._active is None:
+            self._active = asyncio.Semaphore(self.max_active)
+        # A job outlives the request that submitted it, so it gets a trace of its own
+        with span("ranking_job", root=True, job_id=job_id, submitted_trace_id=submitted_trace_id or ""):
+            async with self._active:
+                try:
+                    await self._process(job_id)
+                except Exception as e:
+                    print(f"[ERROR] Ranking job {job_id} failed: {e}")
+                    await self._db(db.set_ranking_job_status, job_id, "failed", str(e), datetime.now())
+
+    async def _process(self, job_id):
+        job = await self._db(db.get_ranking_job, job_id)
+        if job is None:
+            return
+        uploaded_by = job["uploaded_by"]
+        job_title_norm = job["job_title"]
+        criteria_with_weights = json.loads(job["criteria_with_weights"])
+        scoring_mode = job["scoring_mode"] or "llm"
+
+        jd_text = await self._db(db.get_latest_jd_text, job_title_norm)
+        if not jd_text:
+            raise ValueError("No JD found")
+
+        await self._db(db.set_ranking_job_status, job_id, "running", None, datetime.now())
+        done = await self._db(db.get_ranking_job_result_ids, job_id)
+        resumes = await self._db(db.get_session_resumes, uploaded_by, job["upload_session_id"])
+
+        # The 30-day check runs here rather than at submit, so it sees rankings made while the job was queued
+        resumes, skipped = await self._db(
+            partition_resumes, [r for r in resumes if r.id not in done], job_title_norm, datetime.now(),
+        )
+        await self._db(
+            db.insert_ranking_job_results, job_id,
+            [(resume.id, None, json.dumps(result)) for resume, result in skipped], datetime.now(),
+        )
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def run_one(resume):
+            async with slots:
+                try:
+                    result = await self.evaluate(
+                        resume.filename, resume.email, resume.resume_content, jd_text, criteria_with_weights,
+                        uploaded_by, job_title_norm, scoring_mode, resume.id, record_ranking=False,
+                    )
+                except Exception as e:
+                    print(f"[ERROR] Ranking {resume.filename} failed: {e}")
+                    result = {
+                        "filename": resume.filename,
+                        "email": resume.email,
+                        "status": "error",
+                        "message": str(e),
+                    }
+            now = datetime.now()
+            # The ranking goes in with the job result: a crash between two writes would
+            # leave a ranking whose job still counts the resume as pending
+            ranking = None
+            if result["status"] == "processed" and records_ranking(scoring_mode):
+                ranking = (result["email"], result["weighted_score"], uploaded_by, job_title_norm, now, resume.id)
+            await self._db(
+                db.insert_ranking_job_result, job_id, resume.id,
+                result.get("weighted_score"), json.dumps(result), now, ranking,
+            )
+
+        await asyncio.gather(*(run_one(r) for r in resumes))
+        await self._db(db.set_ranking_job_status, job_id, "completed", None, datetime.now())
+        print(f"[INFO] Ranking job {job_id} completed")
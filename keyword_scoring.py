@@ -0,0 +1,165 @@
+import json
+import os
+from collections import deque
+from functools import lru_cache
+
+from shortlist import tokenize
+
+# Offline, deterministic scoring without the LLM. The criteria and their
+# synonyms are compiled into one Aho-Corasick automaton over word tokens, so
+# each resume is scanned once whatever the number of criteria and synonyms.
+# Within a criterion matches are counted longest first and never overlap:
+# "asp.net mvc" is one mention, not also "asp.net" and ".net".
+# Output has the same shape as get_relevance_score: {criterion: {"score",
+# "comment"}, ..., "summary_comment"}.
+#
+# Synonyms are keyed by normalized criterion (dots stripped, lowercased);
+# KEYWORD_SYNONYMS_PATH may point to a JSON file with more entries.
+KEYWORD_SYNONYMS_PATH = os.getenv("KEYWORD_SYNONYMS_PATH")
+
+SYNONYMS = {
+    "net": [".net", "dotnet", "dot net", "asp.net", "asp.net core", "asp.net mvc", ".net core",
+            ".net framework", "vb.net", "c#.net", "ado.net"],
+    "c#": ["c#", "csharp", "c sharp"],
+    "c++": ["c++", "cpp"],
+    "javascript": ["javascript", "js", "ecmascript", "es6"],
+    "typescript": ["typescript"],
+    "node.js": ["node.js", "nodejs", "node"],
+    "react": ["react", "react.js", "reactjs"],
+    "angular": ["angular", "angularjs", "angular.js"],
+    "python": ["python", "python3", "django", "flask", "fastapi", "pandas"],
+    "java": ["java", "spring", "spring boot", "j2ee"],
+    "sql": ["sql", "mysql", "postgresql", "postgres", "sql server", "t-sql", "pl/sql", "oracle"],
+    "aws": ["aws", "amazon web services", "ec2", "s3", "lambda"],
+    "azure": ["azure", "microsoft azure"],
+    "gcp": ["gcp", "google cloud", "google cloud platform"],
+    "kubernetes": ["kubernetes", "k8s", "aks", "eks", "gke"],
+    "docker": ["docker", "containers", "containerization"],
+    "ci/cd": ["ci/cd", "cicd", "continuous integration", "continuous delivery", "jenkins",
+              "github actions", "azure devops", "gitlab ci"],
+    "machine learning": ["machine learning", "ml", "deep learning", "scikit-learn", "tensorflow", "pytorch"],
+    "communication": ["communication", "communication skills", "presentation", "stakeholder"],
+    # "led a team" is "led team" once stopwords are dropped; a bare "led" also matches "led the migration"
+    "leadership": ["leadership", "led a team", "led teams", "team lead", "mentored", "managed a team"],
+}
+
+# score = 100 * (1 - 0.5 ** weighted_hits): one mention 50, two 75, three 88
+PARTIAL_WORD_WEIGHT = 0.5  # single words of a multi-word criterion without synonyms
+
+
+def _load_synonyms():
+    synonyms = {key: list(values) for key, values in SYNONYMS.items()}
+    if KEYWORD_SYNONYMS_PATH:
+        try:
+            with open(KEYWORD_SYNONYMS_PATH, encoding="utf-8") as f:
+                for key, values in json.load(f).items():
+                    synonyms.setdefault(key.strip(".").lower(), []).extend(values)
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Could not load keyword synonyms from {KEYWORD_SYNONYMS_PATH}: {e}")
+    return synonyms
+
+
+_synonyms = _load_synonyms()
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton over token sequences; every pattern carries a payload."""
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for tokens, payload in patterns:
+            state = 0
+            for token in tokens:
+                nxt = self.goto[state].get(token)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][token] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = nxt
+            self.output[state].append(payload)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and token not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(token, 0)
+                self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+
+    def scan(self, tokens):
+        """Yields (end position, payload) of every pattern occurrence in one left-to-right pass."""
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for position, token in enumerate(tokens):
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            for payload in output[state]:
+                yield position, payload
+
+
+@lru_cache(maxsize=64)
+def compile_criteria(criteria):
+    """
+    (automaton, labels) for a tuple of criteria; labels[i][j] names pattern j of
+    criterion i, whose payload is (i, j, weight, length in tokens).
+    """
+    patterns = []
+    labels = []
+    for i, criterion in enumerate(criteria):
+        phrases = {}
+        for phrase in [criterion] + _synonyms.get(criterion.strip(".").lower(), []):
+            tokens = tuple(tokenize(phrase))
+            if tokens:
+                phrases.setdefault(tokens, (phrase.lower(), 1.0))
+        criterion_tokens = tuple(tokenize(criterion))
+        if len(criterion_tokens) > 1 and criterion.strip(".").lower() not in _synonyms:
+            for token in criterion_tokens:
+                phrases.setdefault((token,), (token, PARTIAL_WORD_WEIGHT))
+        criterion_labels = []
+        for j, (tokens, (label, weight)) in enumerate(phrases.items()):
+            patterns.append((tokens, (i, j, weight, len(tokens))))
+            criterion_labels.append(label)
+        labels.append(criterion_labels)
+    return KeywordAutomaton(patterns), labels
+
+
+def keyword_scores(resume_text, criteria_list):
+    """Score a resume against the criteria by keyword evidence."""
+    criteria = tuple(criteria_list)
+    automaton, labels = compile_criteria(criteria)
+    matches = [[] for _ in criteria]
+    for end, (i, j, weight, length) in automaton.scan(tokenize(resume_text)):
+        matches[i].append((end - length + 1, -length, j, weight))
+
+    weighted = [0.0] * len(criteria)
+    counts = [dict() for _ in criteria]
+    for i, found in enumerate(matches):
+        covered = 0  # leftmost-longest: a match starting inside the previous one is part of it
+        for start, negative_length, j, weight in sorted(found):
+            if start < covered:
+                continue
+            covered = start - negative_length
+            weighted[i] += weight
+            counts[i][j] = counts[i].get(j, 0) + 1
+
+    result = {}
+    matched = 0
+    for i, criterion in enumerate(criteria):
+        score = round(100 * (1 - 0.5 ** weighted[i]))
+        if counts[i]:
+            matched += 1
+            found = sorted(counts[i].items(), key=lambda item: -item[1])
+            comment = "Keyword matches: " + ", ".join(f"{labels[i][j]} x{n}" for j, n in found)
+        else:
+            comment = "No evidence"
+        result[criterion] = {"score": score, "comment": comment}
+    result["summary_comment"] = f"Offline keyword scoring: evidence for {matched} of {len(criteria)} criteria."
+    return result
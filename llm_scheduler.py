@@ -0,0 +1,183 @@
+import asyncio
+import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+import openai
+
+from metrics import registry
+from tracing import span
+
+# Rate control in front of Azure OpenAI. Every call is admitted through two
+# token buckets, requests per minute and tokens per minute, so a large batch
+# runs at the deployment's quota instead of bursting into 429s. Azure grants
+# 6 RPM per 1000 TPM, so the RPM default follows the TPM setting.
+AZURE_OPENAI_TPM = int(os.getenv("AZURE_OPENAI_TPM", "50000"))
+AZURE_OPENAI_RPM = int(os.getenv("AZURE_OPENAI_RPM", str(max(1, AZURE_OPENAI_TPM * 6 // 1000))))
+# Buckets hold this many seconds of quota; Azure enforces limits over short
+# windows, so a full minute's burst up front would be throttled anyway
+LLM_BURST_SECONDS = float(os.getenv("LLM_BURST_SECONDS", "10"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "1"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "60"))
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+llm_call_seconds = registry.histogram("llm_call_seconds", "LLM API call latency per attempt", ("outcome",))
+llm_admission_wait_seconds = registry.histogram(
+    "llm_admission_wait_seconds", "Time an LLM call waited for the rate limiter", (),
+)
+llm_rate_limited = registry.counter("llm_rate_limited_total", "LLM calls answered with 429")
+llm_retries = registry.counter("llm_retries_total", "LLM calls retried after a retryable error", ("error",))
+
+
+class TokenBucket:
+    def __init__(self, per_minute, burst_seconds=LLM_BURST_SECONDS):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` tokens are available (amount is capped at capacity)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def drain(self):
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+
+
+def retry_after_seconds(error):
+    """The server's Retry-After hint from a failed call, in seconds, or None."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMScheduler:
+    """
+    Admits LLM calls in FIFO order once both buckets have room, and retries
+    throttled or failed calls.
+
+    A 429 pauses admission for everyone until its Retry-After has passed,
+    since the quota is shared, and the caller retries after that delay plus
+    jitter. Errors without a hint back off exponentially with full jitter.
+    """
+
+    def __init__(self, rpm=AZURE_OPENAI_RPM, tpm=AZURE_OPENAI_TPM, max_retries=LLM_MAX_RETRIES,
+                 backoff_base=LLM_BACKOFF_BASE_SECONDS, backoff_max=LLM_BACKOFF_MAX_SECONDS):
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.in_flight = 0
+        self._paused_until = 0.0
+        self._lock = None
+
+    async def acquire(self, estimated_tokens):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # The lock keeps callers in arrival order; only its holder waits on the buckets
+        async with self._lock:
+            while True:
+                wait = self._paused_until - time.monotonic()
+                if self.requests is not None:
+                    wait = max(wait, self.requests.wait_time(1))
+                if self.tokens is not None:
+                    wait = max(wait, self.tokens.wait_time(estimated_tokens))
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            if self.requests is not None:
+                self.requests.take(1)
+            if self.tokens is not None:
+                self.tokens.take(estimated_tokens)
+
+    def _backoff(self, attempt, error):
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            if isinstance(error, openai.RateLimitError):
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+                for bucket in (self.requests, self.tokens):
+                    if bucket is not None:
+                        bucket.drain()
+            return retry_after + random.uniform(0, self.backoff_base)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def call(self, estimated_tokens, make_call):
+        """Await make_call() under the rate limits; make_call must return a new awaitable each time."""
+        attempt = 0
+        while True:
+            with llm_admission_wait_seconds.time(), span("llm.admission", estimated_tokens=estimated_tokens):
+                await self.acquire(estimated_tokens)
+            self.in_flight += 1
+            start = time.perf_counter()
+            outcome = "error"
+            try:
+                with span("llm.attempt", attempt=attempt) as current:
+                    try:
+                        result = await make_call()
+                        outcome = "ok"
+                        return result
+                    except openai.RateLimitError:
+                        outcome = "rate_limited"
+                        raise
+                    finally:
+                        current.set(outcome=outcome)
+            except RETRYABLE_ERRORS as e:
+                if outcome == "rate_limited":
+                    llm_rate_limited.inc()
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt, e)
+                llm_retries.inc(error=type(e).__name__)
+                print(f"[WARN] LLM call failed ({type(e).__name__}), retrying in {delay:.1f}s")
+            finally:
+                self.in_flight -= 1
+                llm_call_seconds.observe(time.perf_counter() - start, outcome=outcome)
+            attempt += 1
+            with span("llm.backoff", seconds=round(delay, 3)):
+                await asyncio.sleep(delay)
+
+
+llm_scheduler = LLMScheduler()
+
+registry.gauge("llm_in_flight", "LLM calls currently awaiting a response", fn=lambda: llm_scheduler.in_flight)
@@ -14,8 +14,7 @@
 # import io
 # from datetime import datetime, timedelta
 
-# from extract import extract_text_from_pdf, extract_text_from_docx
-# from rank import get_relevance_score, calculate_weighted_score_manual
+# # from rank import get_relevance_score, calculate_weighted_score_manual
 
 # # Load env
 # load_dotenv()
@@ -581,24 +580,39 @@
 
 
 
-from fastapi import FastAPI, File, UploadFile, Form, Query, Depends, HTTPException, Header
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import FastAPI, File, UploadFile, Form, Query, Depends, HTTPException, Header, Request
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from sqlalchemy import create_engine, text
-from typing import List
+from pydantic import BaseModel, Field
+import db
+from typing import List, Optional
 from datetime import datetime, timedelta
-from concurrent.futures import ThreadPoolExecutor
 import asyncio
 import uuid
 import re
 import os
 from dotenv import load_dotenv
-import io
+import json
+import shutil
+import tempfile
 from datetime import datetime, timedelta
 
 from extract import extract_text_from_pdf, extract_text_from_docx
-from rank import get_relevance_score, calculate_weighted_score_manual
+from compact import compact_resume
+from dedup import partition_resumes, records_ranking
+from eval_batcher import evaluation_batcher
+from eval_cache import evaluation_cache, normalize_criterion
+from extract_cache import extraction_cache
+from extraction_engine import extraction_engine
+from ingest import iter_multipart, remove_spooled, MultipartError, SpooledUpload
+from jobs import RankingJobs
+from keyword_scoring import keyword_scores
+from metrics import RequestMetricsMiddleware, registry
+from shortlist import shortlist
+from rank import calculate_weighted_score_manual
+from scorers import get_scorer, close_scorer
+import tracing
+from tracing import TracingMiddleware, TracingThreadPoolExecutor, span
 
 # Load env
 load_dotenv()
@@ -610,122 +624,282 @@ app = FastAPI()
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"],
+    expose_headers=[tracing.TRACE_HEADER],
 )
 
-executor = ThreadPoolExecutor(max_workers=10)  # ⭐ CHANGED: global thread pool
+# ⭐ Per-endpoint request latency, served with everything else on /metrics
+http_request_seconds = registry.histogram(
+    "http_request_seconds", "Request latency by route (streaming responses: until the body is sent)",
+    ("method", "path", "status"),
+)
+app.add_middleware(RequestMetricsMiddleware, histogram=http_request_seconds)
+
+# ⭐ Request-scoped tracing: every response carries X-Trace-Id; with TRACE_EXPORT set,
+# spans per stage and per resume are written out (see tracing.py)
+app.add_middleware(TracingMiddleware)
 
-def get_db_engine():
-    return create_engine("sqlite:///Resume_Parser.db", connect_args={"check_same_thread": False})
+# ⭐ CHANGED: global thread pool (I/O only; parsing uses extraction_engine); calls keep the caller's trace
+executor = TracingThreadPoolExecutor(max_workers=10)
+registry.gauge("executor_queue_depth", "DB/IO calls waiting for a thread of the shared executor",
+               fn=lambda: executor._work_queue.qsize())
+
+# Max uploaded files being read/extracted/stored at once per upload request
+INGEST_MAX_IN_FLIGHT = int(os.getenv("INGEST_MAX_IN_FLIGHT", str(extraction_engine.workers * 2)))
+# Group commit for uploaded resumes: rows are written in one transaction once
+# RESUME_INSERT_BATCH_SIZE are waiting or RESUME_INSERT_LINGER_SECONDS have passed
+RESUME_INSERT_BATCH_SIZE = int(os.getenv("RESUME_INSERT_BATCH_SIZE", "100"))
+RESUME_INSERT_LINGER_SECONDS = float(os.getenv("RESUME_INSERT_LINGER_SECONDS", "0.25"))
 
 def extract_email_regex(text):
     match = re.search(r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+", text)
     return match.group(0) if match else None
 
 def initialize_database():
-    engine = get_db_engine()
-    with engine.begin() as conn:
-        conn.execute(text("""
-            CREATE TABLE IF NOT EXISTS TempResumes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                filename TEXT, email TEXT, resume_content TEXT,
-                uploaded_by TEXT, upload_session_id TEXT, created_at DATETIME
-            )
-        """))
-        conn.execute(text("""
-            CREATE TABLE IF NOT EXISTS TempJobDescription (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                uploaded_by TEXT, job_title TEXT, jd_text TEXT,
-                upload_session_id TEXT, created_at DATETIME
-            )
-        """))
-        conn.execute(text("""
-            CREATE TABLE IF NOT EXISTS CV_Ranking_User_Email (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                email TEXT, weighted_score REAL, uploaded_by TEXT,
-                job_title TEXT, created_at DATETIME
-            )
-        """))
-
-# ⭐ Parallel extraction helper
-def parse_resume(file_name, content_bytes):
-    file_name = file_name.lower()
-    if file_name.endswith(".pdf"):
-        return extract_text_from_pdf(io.BytesIO(content_bytes))
-    elif file_name.endswith(".docx"):
-        return extract_text_from_docx(io.BytesIO(content_bytes))
-    return None
+    db.initialize_database()
+
+async def extract_with_cache(cache_key, extract):
+    loop = asyncio.get_running_loop()
+    cached_text = await loop.run_in_executor(executor, extraction_cache.get, cache_key)
+    if cached_text is not None:
+        return cached_text
+    resume_text = await extract()
+    if resume_text:
+        await loop.run_in_executor(executor, extraction_cache.put, cache_key, resume_text)
+    return resume_text
+
+# ⭐ Parallel extraction helper (repeat uploads are served from the extraction cache,
+# everything else is parsed in the extraction process pool)
+async def parse_resume(file_name, content_bytes):
+    with span("parse_resume", filename=file_name, size=len(content_bytes)):
+        loop = asyncio.get_running_loop()
+        cache_key = await loop.run_in_executor(executor, extraction_cache.key_for, file_name, content_bytes)
+        if cache_key is None:
+            return None
+        return await extract_with_cache(cache_key, lambda: extraction_engine.extract(file_name, content_bytes))
+
+async def parse_spooled_resume(file_name, upload):
+    with span("parse_resume", filename=file_name, size=upload.size):
+        cache_key = extraction_cache.key_for_digest(file_name, upload.sha256)
+        if cache_key is None:
+            return None
+        return await extract_with_cache(cache_key, lambda: extraction_engine.extract_file(file_name, upload.path))
 
 import re
 
+def sanitize_filename(file_name):
+    # Remove special characters that may cause issues
+    return re.sub(r'[<>:"/\|?*]', '_', file_name)
+
+class ResumeBatchWriter:
+    """
+    Group commit for one upload session. Concurrent store() calls are collected
+    and written together; each call resolves to whether its own row was stored.
+    """
+
+    def __init__(self, uploaded_by, session_id,
+                 batch_size=RESUME_INSERT_BATCH_SIZE, linger=RESUME_INSERT_LINGER_SECONDS):
+        self.uploaded_by = uploaded_by
+        self.session_id = session_id
+        self.batch_size = max(1, batch_size)
+        self.linger = linger
+        self._pending = []
+        self._timer = None
+        self._writes = set()
+
+    async def store(self, filename, email, resume_text):
+        loop = asyncio.get_running_loop()
+        stored = loop.create_future()
+        self._pending.append(({
+            "filename": filename, "email": email, "resume_content": resume_text,
+            "uploaded_by": self.uploaded_by, "session_id": self.session_id, "created_at": datetime.now()
+        }, stored))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.linger, self._flush)
+        return await stored
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        write = asyncio.ensure_future(self._write(batch))
+        self._writes.add(write)
+        write.add_done_callback(self._writes.discard)
+
+    async def _write(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            failed = await loop.run_in_executor(executor, db.insert_resume_rows, [row for row, _ in batch])
+        except Exception as e:
+            print(f"[ERROR] Failed to store resume batch: {e}")
+            failed = set(range(len(batch)))
+        for i, (_, stored) in enumerate(batch):
+            if not stored.done():
+                stored.set_result(i not in failed)
+
+    async def close(self):
+        self._flush()
+        if self._writes:
+            await asyncio.gather(*self._writes)
+
 @app.post("/upload-folder/")
 async def upload_folder(uploaded_by: str = Form(...), files: List[UploadFile] = File(...)):
     session_id = str(uuid.uuid4())
     bad_files = []
-
-    def sanitize_filename(file_name):
-        # Remove special characters that may cause issues
-        return re.sub(r'[<>:"/\|?*]', '_', file_name)
+    window = asyncio.Semaphore(INGEST_MAX_IN_FLIGHT)
+    writer = ResumeBatchWriter(uploaded_by, session_id)
 
     async def process_and_store(file):
         try:
-            content = await file.read()
-            sanitized_filename = sanitize_filename(file.filename)  # sanitize the filename
-            loop = asyncio.get_running_loop()
-            resume_text = await loop.run_in_executor(executor, parse_resume, sanitized_filename, content)
-            
+            async with window:  # bound how many file bodies are held in memory at once
+                content = await file.read()
+                sanitized_filename = sanitize_filename(file.filename)  # sanitize the filename
+                resume_text = await parse_resume(sanitized_filename, content)
+                del content
+
             if not resume_text:
                 bad_files.append(sanitized_filename)
                 return
-            
+
             email = extract_email_regex(resume_text) or "unknown@example.com"
-            engine = get_db_engine()
-            with engine.begin() as conn:
-                conn.execute(text("""
-                    INSERT INTO TempResumes (filename, email, resume_content, uploaded_by, upload_session_id, created_at)
-                    VALUES (:filename, :email, :resume_content, :uploaded_by, :session_id, :created_at)
-                """), {
-                    "filename": sanitized_filename, "email": email, "resume_content": resume_text,
-                    "uploaded_by": uploaded_by, "session_id": session_id, "created_at": datetime.now()
-                })
+            if not await writer.store(sanitized_filename, email, resume_text):
+                bad_files.append(sanitized_filename)
         except Exception as e:
             bad_files.append(file.filename)
 
     tasks = [process_and_store(file) for file in files]
     await asyncio.gather(*tasks)
+    await writer.close()
 
     return {"status": "success", "uploaded_by": uploaded_by, "bad_files": bad_files}
 
+# ⭐ Streaming upload: parts are spooled to disk as they arrive and extracted through
+# a bounded window, so memory stays flat however big the folder is. Responds with
+# NDJSON, one line per file as it finishes, then a summary line.
+@app.post("/upload-folder-stream/")
+async def upload_folder_stream(request: Request):
+    session_id = str(uuid.uuid4())
+    spool_dir = tempfile.mkdtemp(prefix="resume-upload-")
+    window = asyncio.Semaphore(INGEST_MAX_IN_FLIGHT)
+    results = asyncio.Queue()
+    tasks = []
+    waiting = []  # files that arrived before the uploaded_by field
+    uploaded_by = None
+    writer = None
+
+    async def ingest(upload):
+        sanitized_filename = sanitize_filename(upload.filename)
+        try:
+            try:
+                resume_text = await parse_spooled_resume(sanitized_filename, upload)
+            finally:
+                # The slot covers spooled file + extraction; waiting for the group
+                # commit below only holds the extracted text.
+                remove_spooled(upload)
+                window.release()
+            if not resume_text:
+                result = {"filename": sanitized_filename, "status": "bad_file"}
+            else:
+                email = extract_email_regex(resume_text) or "unknown@example.com"
+                if await writer.store(sanitized_filename, email, resume_text):
+                    result = {"filename": sanitized_filename, "email": email, "status": "stored"}
+                else:
+                    result = {"filename": sanitized_filename, "status": "bad_file", "error": "Failed to store resume"}
+        except Exception as e:
+            result = {"filename": sanitized_filename, "status": "bad_file", "error": str(e)}
+        await results.put(result)
+
+    async def schedule(upload):
+        await window.acquire()  # backpressure: stop reading the body while the window is full
+        tasks.append(asyncio.create_task(ingest(upload)))
+
+    async def cleanup():
+        # Stops extractions still running (client gone, request cancelled), lands the rows
+        # already handed to the writer and removes whatever is left in the spool
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if writer is not None:
+            await writer.close()
+        shutil.rmtree(spool_dir, ignore_errors=True)
+
+    try:
+        async for item in iter_multipart(request, spool_dir):
+            if isinstance(item, SpooledUpload):
+                if uploaded_by is None:
+                    waiting.append(item)
+                else:
+                    await schedule(item)
+            elif item[0] == "uploaded_by":
+                uploaded_by = item[1]
+                writer = ResumeBatchWriter(uploaded_by, session_id)
+                for upload in waiting:
+                    await schedule(upload)
+                waiting = []
+    except MultipartError as e:
+        # Files before the malformed part are already committed: say which in the error
+        await asyncio.gather(*tasks)
+        await cleanup()
+        ingested = [results.get_nowait() for _ in range(len(tasks))]
+        stored_files = [r["filename"] for r in ingested if r["status"] == "stored"]
+        return JSONResponse(content={
+            "error": str(e), "uploaded_by": uploaded_by, "stored": len(stored_files),
+            "stored_files": stored_files, "bad_files": [r["filename"] for r in ingested if r["status"] != "stored"],
+        }, status_code=400)
+    except BaseException:
+        await cleanup()
+        raise
+
+    if uploaded_by is None:
+        await cleanup()
+        return JSONResponse(content={"error": "uploaded_by is required"}, status_code=400)
+
+    async def stream_results():
+        bad_files = []
+        stored = 0
+        try:
+            for _ in range(len(tasks)):
+                result = await results.get()
+                if result["status"] == "stored":
+                    stored += 1
+                else:
+                    bad_files.append(result["filename"])
+                yield json.dumps(result) + "\n"
+            await writer.close()
+            yield json.dumps({
+                "status": "success", "uploaded_by": uploaded_by,
+                "stored": stored, "bad_files": bad_files,
+            }) + "\n"
+        finally:
+            await cleanup()
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
 # ✅ upload-jd unchanged except make it async
 @app.post("/upload-jd/")
 async def upload_job_description(
     uploaded_by: str = Form(...), job_title: str = Form(...), jd_file: UploadFile = File(...)
 ):
     content = await jd_file.read()
-    loop = asyncio.get_running_loop()
-    if jd_file.filename.endswith(".docx"):
-        jd_text = await loop.run_in_executor(executor, extract_text_from_docx, io.BytesIO(content))
-    elif jd_file.filename.endswith(".pdf"):
-        jd_text = await loop.run_in_executor(executor, extract_text_from_pdf, io.BytesIO(content))
+    if jd_file.filename.endswith((".docx", ".pdf")):
+        jd_text = await parse_resume(jd_file.filename, content)
     else:
         return JSONResponse(content={"error": "Unsupported file type"}, status_code=400)
 
     job_title_lower = job_title.strip().lower()
     session_id = str(uuid.uuid4())
-    engine = get_db_engine()
-
-    with engine.begin() as conn:
-        existing = conn.execute(text("""
-            SELECT jd_text FROM TempJobDescription WHERE LOWER(job_title)=:job_title
-            ORDER BY created_at DESC LIMIT 1
-        """), {"job_title": job_title_lower}).fetchone()
-        if existing:
-            return {"status": "exists", "job_title": job_title}
-
-        conn.execute(text("""
-            INSERT INTO TempJobDescription (uploaded_by, job_title, jd_text, upload_session_id, created_at)
-            VALUES (:uploaded_by, :job_title, :jd_text, :session_id, :created_at)
-        """), {"uploaded_by": uploaded_by, "job_title": job_title_lower,
-               "jd_text": jd_text, "session_id": session_id, "created_at": datetime.now()})
+    loop = asyncio.get_running_loop()
+
+    inserted = await loop.run_in_executor(
+        executor, db.insert_job_description_if_new,
+        uploaded_by, job_title_lower, jd_text, session_id, datetime.now()
+    )
+    if not inserted:
+        return {"status": "exists", "job_title": job_title}
 
     return {"status": "success", "job_title": job_title}
 
@@ -734,6 +908,12 @@ class RankRequest(BaseModel):
     criteria_with_weights: List[dict]
     uploaded_by: str
     job_title: str
+    # Optional BM25 shortlist: only the top K resumes and/or those scoring at
+    # least min_score against the JD + criteria are sent to the LLM
+    shortlist_top_k: Optional[int] = Field(None, ge=1)
+    shortlist_min_score: Optional[float] = Field(None, ge=0)
+    # "keyword": offline keyword scoring, no LLM calls (e.g. while Azure is throttled)
+    scoring_mode: str = Field("llm", regex="^(llm|keyword)$")
     
     
 # def normalize_criteria(criteria_list):
@@ -748,138 +928,295 @@ class RankRequest(BaseModel):
 #     return [c.strip().lower() for c in criteria_list]
 
 
-@app.post("/rank-resumes-dynamic/")
-async def rank_uploaded_resumes_dynamic(request: RankRequest):
-    criteria = [c["criterion"] for c in request.criteria_with_weights]
-    # criteria = normalize_criteria(criteria)
+async def score_criteria(resume_text, jd_text, criteria_list):
+    """
+    The scorer's evaluation of a resume, asking the model only about criteria
+    that have no stored score for this resume/JD pair yet.
+    """
+    loop = asyncio.get_running_loop()
+    scores_key = evaluation_cache.scores_key_for(resume_text, jd_text)
+    scores, summary = await loop.run_in_executor(executor, evaluation_cache.get_scores, scores_key, criteria_list)
+
+    missing = []
+    for criterion in criteria_list:
+        if normalize_criterion(criterion) not in scores and criterion not in missing:
+            missing.append(criterion)
+
+    if missing:
+        eval_result = await evaluation_batcher.evaluate(resume_text, jd_text, missing)
+        source = eval_result
+        if isinstance(eval_result.get("criteria_list"), dict):
+            source = eval_result["criteria_list"]
+        # Only criteria the model actually answered are stored; the others are asked again next time
+        wanted = {normalize_criterion(c) for c in missing}
+        new_scores = {
+            normalize_criterion(key): value for key, value in source.items()
+            if normalize_criterion(key) in wanted and isinstance(value, dict)
+        }
+        summary = eval_result.get("summary_comment", summary or "")
+        await loop.run_in_executor(executor, evaluation_cache.put_scores, scores_key, new_scores, summary)
+        scores.update(new_scores)
+
+    result = {}
+    for criterion in criteria_list:
+        key = normalize_criterion(criterion)
+        if key in scores:
+            result[criterion] = scores[key]
+    result["summary_comment"] = summary or ""
+    return result
+
+
+async def evaluate_resume(filename, email, resume_text, jd_text, criteria_with_weights, uploaded_by, job_title_norm,
+                          scoring_mode="llm", resume_id=None, record_ranking=True):
+    """record_ranking=False leaves storing the ranking to the caller (ranking jobs store it with the job result)."""
+    with span("evaluate_resume", filename=filename, scoring_mode=scoring_mode) as current:
+        result = await _evaluate_resume(filename, email, resume_text, jd_text, criteria_with_weights, uploaded_by,
+                                        job_title_norm, scoring_mode, resume_id, record_ranking)
+        current.set(status=result["status"])
+        return result
+
+
+async def _evaluate_resume(filename, email, resume_text, jd_text, criteria_with_weights, uploaded_by, job_title_norm,
+                           scoring_mode, resume_id, record_ranking):
+    # Recent applicants and duplicate uploads were already set aside by partition_resumes
+    criteria = [c["criterion"] for c in criteria_with_weights]
+    loop = asyncio.get_running_loop()
+
+    resume_text_lower = resume_text.lower()
+    # Ensure resume text is lowercased
+    criteria_lower = [criterion.lower() for criterion in criteria]
+
+    if scoring_mode == "keyword":
+        # Whole resume, no compaction needed: the scan is local and cheap
+        with span("keyword_scores"):
+            eval_result = keyword_scores(resume_text_lower, criteria_lower)
+        compaction = None
+    else:
+        with span("compact_resume") as current:
+            resume_text_lower, compaction = compact_resume(resume_text_lower)
+            current.set(original_tokens=compaction.original_tokens, compacted_tokens=compaction.compacted_tokens)
+
+        with span("score_resume") as current:
+            cache_key = evaluation_cache.key_for(resume_text_lower, jd_text, criteria_lower)
+            eval_result = await loop.run_in_executor(executor, evaluation_cache.get, cache_key)
+            current.set(cached=eval_result is not None)
+            if eval_result is None:
+                eval_result = await score_criteria(resume_text_lower, jd_text, criteria_lower)
+                await loop.run_in_executor(executor, evaluation_cache.put, cache_key, eval_result)
+
+    # section_scores = {}
+    # for criterion in criteria_lower:
+    #     if criterion in eval_result:
+    #         section_scores[criterion] = eval_result[criterion]
+    #     else:
+    #         section_scores[criterion] = {"score": 0, "comment": "Criterion not found in result"}
     
-    # print("------------------------------",criteria)
-    uploaded_by = request.uploaded_by
-    job_title_norm = request.job_title.strip().lower()
+    
+    # In main.py, inside the evaluate_resume function...
 
-    engine = get_db_engine()
-    jd_row = None
-    with engine.connect() as conn:
-        jd_row = conn.execute(text("""
-            SELECT jd_text FROM TempJobDescription WHERE LOWER(job_title)=:jt
-            ORDER BY created_at DESC LIMIT 1
-        """), {"jt": job_title_norm}).fetchone()
-    if not jd_row:
-        return JSONResponse(content={"error": "No JD found"}, status_code=400)
-
-    jd_text = jd_row[0]
-
-    session_id_row = None
-    with engine.connect() as conn:
-        session_id_row = conn.execute(text("""
-            SELECT upload_session_id FROM TempResumes WHERE uploaded_by=:ub
-            ORDER BY created_at DESC LIMIT 1
-        """), {"ub": uploaded_by}).fetchone()
-    if not session_id_row:
-        return JSONResponse(content={"error": "No resumes found"}, status_code=400)
-
-    session_id = session_id_row[0]
-    resumes = []
-    with engine.connect() as conn:
-        resumes = conn.execute(text("""
-            SELECT filename, email, resume_content FROM TempResumes
-            WHERE uploaded_by=:ub AND upload_session_id=:sid
-        """), {"ub": uploaded_by, "sid": session_id}).fetchall()
-
-    async def evaluate_resume(filename, email, resume_text):
-        # Check if this resume has already applied for the same job title within the last 30 days
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        with engine.connect() as conn:
-            recent_entry = conn.execute(text("""
-                SELECT 1 FROM CV_Ranking_User_Email 
-                WHERE email = :email AND job_title = :job_title AND created_at >= :cutoff
-            """), {
-                "email": email, 
-                "job_title": job_title_norm,
-                "cutoff": thirty_days_ago
-            }).fetchone()
-
-        if recent_entry:
-            return {
-                "filename": filename,
-                "email": email,
-                "status": "skipped",
-                "message": "This resume has applied for the same position within the last month."
-            }
+    # 1. Determine the correct dictionary containing the scores
+    score_source = None
+    if 'criteria_list' in eval_result and isinstance(eval_result['criteria_list'], dict):
+        # Use the nested dictionary if 'criteria_list' key exists
+        score_source = eval_result['criteria_list']
+    else:
+        # Otherwise, use the top-level dictionary
+        score_source = eval_result
 
-        # Otherwise, proceed with evaluation
-        loop = asyncio.get_running_loop()
-        resume_text_lower = resume_text.lower()
-        # Ensure resume text is lowercased
-        criteria_lower = [criterion.lower() for criterion in criteria]
-        
-        eval_result = await loop.run_in_executor(executor, get_relevance_score, resume_text_lower, jd_text, criteria_lower)
-
-        # section_scores = {}
-        # for criterion in criteria_lower:
-        #     if criterion in eval_result:
-        #         section_scores[criterion] = eval_result[criterion]
-        #     else:
-        #         section_scores[criterion] = {"score": 0, "comment": "Criterion not found in result"}
-        
-        
-        # In main.py, inside the evaluate_resume function...
+    # 2. Create a normalized mapping of keys from the score source
+    normalized_score_source = {key.strip(".").lower(): value for key, value in score_source.items()}
 
-        # 1. Determine the correct dictionary containing the scores
-        score_source = None
-        if 'criteria_list' in eval_result and isinstance(eval_result['criteria_list'], dict):
-            # Use the nested dictionary if 'criteria_list' key exists
-            score_source = eval_result['criteria_list']
+    # 3. Populate section_scores using the original criteria to preserve keys
+    section_scores = {}
+    for original_criterion in criteria:  # `criteria` is the list from the request, e.g., ['.net']
+        # Normalize the criterion for lookup
+        normalized_criterion = original_criterion.strip(".").lower()
+        
+        if normalized_criterion in normalized_score_source:
+            # If found, add it to section_scores with the original key
+            section_scores[original_criterion] = normalized_score_source[normalized_criterion]
         else:
-            # Otherwise, use the top-level dictionary
-            score_source = eval_result
+            # If not found, assign the default error value
+            section_scores[original_criterion] = {"score": 0, "comment": "Criterion not found in result"}
 
-        # 2. Create a normalized mapping of keys from the score source
-        normalized_score_source = {key.strip(".").lower(): value for key, value in score_source.items()}
+    weighted_score, _ = calculate_weighted_score_manual(section_scores, criteria_with_weights)
 
-        # 3. Populate section_scores using the original criteria to preserve keys
-        section_scores = {}
-        for original_criterion in criteria:  # `criteria` is the list from the request, e.g., ['.net']
-            # Normalize the criterion for lookup
-            normalized_criterion = original_criterion.strip(".").lower()
-            
-            if normalized_criterion in normalized_score_source:
-                # If found, add it to section_scores with the original key
-                section_scores[original_criterion] = normalized_score_source[normalized_criterion]
-            else:
-                # If not found, assign the default error value
-                section_scores[original_criterion] = {"score": 0, "comment": "Criterion not found in result"}
-
-        weighted_score, _ = calculate_weighted_score_manual(section_scores, request.criteria_with_weights)
-
-        with engine.begin() as conn:
-            conn.execute(text(""" 
-                INSERT INTO CV_Ranking_User_Email (email, weighted_score, uploaded_by, job_title, created_at) 
-                VALUES (:email, :score, :ub, :jt, :dt)
-            """), {
-                "email": email, "score": weighted_score,
-                "ub": uploaded_by, "jt": job_title_norm,
-                "dt": datetime.now()
-            })
-
-        return {
-            "filename": filename,
-            "email": email,
-            "weighted_score": weighted_score,
-            "section_scores": section_scores,
-            "evaluation_summary": eval_result.get("summary_comment", ""),
-            "status": "processed"
-        }
+    if record_ranking and records_ranking(scoring_mode):
+        await loop.run_in_executor(
+            executor, db.insert_ranking, email, weighted_score, uploaded_by, job_title_norm, datetime.now(), resume_id
+        )
+
+    return {
+        "filename": filename,
+        "email": email,
+        "weighted_score": weighted_score,
+        "section_scores": section_scores,
+        "evaluation_summary": eval_result.get("summary_comment", ""),
+        "compaction": compaction.as_dict() if compaction else None,
+        "scoring_mode": scoring_mode,
+        "status": "processed"
+    }
+
+
+async def apply_shortlist(request, resumes, jd_text):
+    """
+    Split the session's resumes by the request's shortlist settings. Returns
+    (resumes to evaluate, [(resume, "filtered" result)], {resume id: lexical score});
+    everything is evaluated when no shortlist is requested.
+    """
+    if request.shortlist_top_k is None and request.shortlist_min_score is None:
+        return list(resumes), [], {}
+    loop = asyncio.get_running_loop()
+    criteria = [c["criterion"] for c in request.criteria_with_weights]
+    selected, scores = await loop.run_in_executor(
+        executor, shortlist, [r.resume_content for r in resumes], jd_text, criteria,
+        request.shortlist_top_k, request.shortlist_min_score,
+    )
+    lexical = {r.id: round(score, 4) for r, score in zip(resumes, scores)}
+    keep = set(selected)
+    filtered = [
+        (r, {"filename": r.filename, "email": r.email, "status": "filtered", "lexical_score": lexical[r.id]})
+        for i, r in enumerate(resumes) if i not in keep
+    ]
+    print(f"[INFO] Shortlist kept {len(selected)} of {len(resumes)} resumes")
+    return [resumes[i] for i in selected], filtered, lexical
+
+
+async def load_ranking_inputs(uploaded_by, job_title_norm):
+    """The JD text and latest upload session to rank, or an error response."""
+    loop = asyncio.get_running_loop()
+    jd_text = await loop.run_in_executor(executor, db.get_latest_jd_text, job_title_norm)
+    if not jd_text:
+        return None, None, JSONResponse(content={"error": "No JD found"}, status_code=400)
+
+    session_id = await loop.run_in_executor(executor, db.get_latest_session_id, uploaded_by)
+    if not session_id:
+        return None, None, JSONResponse(content={"error": "No resumes found"}, status_code=400)
+    return jd_text, session_id, None
+
+
+@app.post("/rank-resumes-dynamic/")
+async def rank_uploaded_resumes_dynamic(request: RankRequest):
+    uploaded_by = request.uploaded_by
+    job_title_norm = request.job_title.strip().lower()
+
+    jd_text, session_id, error = await load_ranking_inputs(uploaded_by, job_title_norm)
+    if error:
+        return error
+
+    loop = asyncio.get_running_loop()
+    resumes = await loop.run_in_executor(executor, db.get_session_resumes, uploaded_by, session_id)
+    resumes, skipped = await loop.run_in_executor(executor, partition_resumes, resumes, job_title_norm, datetime.now())
+    resumes, filtered, lexical = await apply_shortlist(request, resumes, jd_text)
 
     # Process each resume and gather results
-    tasks = [evaluate_resume(f, e, t) for f, e, t in resumes]
+    tasks = [
+        evaluate_resume(r.filename, r.email, r.resume_content, jd_text,
+                        request.criteria_with_weights, uploaded_by, job_title_norm, request.scoring_mode, r.id)
+        for r in resumes
+    ]
     results = await asyncio.gather(*tasks)
+    if lexical:
+        for r, result in zip(resumes, results):
+            result["lexical_score"] = lexical[r.id]
+    results += [result for _, result in skipped + filtered]
 
     # Sort results by weighted score
     results.sort(key=lambda x: x.get("weighted_score", 0), reverse=True)
     
     return {"ranked_resumes": results}
 
+
+# ⭐ Streaming ranking: NDJSON, one line per resume as soon as its evaluation
+# finishes, then a final line with the ordered leaderboard.
+@app.post("/rank-resumes-stream/")
+async def rank_resumes_stream(request: RankRequest):
+    uploaded_by = request.uploaded_by
+    job_title_norm = request.job_title.strip().lower()
+
+    jd_text, session_id, error = await load_ranking_inputs(uploaded_by, job_title_norm)
+    if error:
+        return error
+
+    loop = asyncio.get_running_loop()
+    resumes = await loop.run_in_executor(executor, db.get_session_resumes, uploaded_by, session_id)
+    resumes, skipped = await loop.run_in_executor(executor, partition_resumes, resumes, job_title_norm, datetime.now())
+    resumes, filtered, lexical = await apply_shortlist(request, resumes, jd_text)
+
+    async def evaluate(resume):
+        try:
+            result = await evaluate_resume(resume.filename, resume.email, resume.resume_content, jd_text,
+                                           request.criteria_with_weights, uploaded_by, job_title_norm,
+                                           request.scoring_mode, resume.id)
+        except Exception as e:
+            print(f"[ERROR] Ranking {resume.filename} failed: {e}")
+            result = {"filename": resume.filename, "email": resume.email, "status": "error", "message": str(e)}
+        if lexical:
+            result["lexical_score"] = lexical[resume.id]
+        return result
+
+    async def stream_results():
+        tasks = [asyncio.create_task(evaluate(r)) for r in resumes]
+        results = []
+        try:
+            for _, result in skipped + filtered:
+                results.append(result)
+                yield json.dumps(result) + "\n"
+            for next_result in asyncio.as_completed(tasks):
+                result = await next_result
+                results.append(result)
+                yield json.dumps(result) + "\n"
+            results.sort(key=lambda x: x.get("weighted_score", 0), reverse=True)
+            yield json.dumps({"status": "completed", "ranked_resumes": results}) + "\n"
+        finally:
+            # Client went away: stop evaluating what is left
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
+# ⭐ Ranking as a background job: submit returns at once, poll for progress
+ranking_jobs = RankingJobs(evaluate_resume, executor)
+
+
+@app.post("/rank-jobs/")
+async def submit_ranking_job(request: RankRequest):
+    uploaded_by = request.uploaded_by
+    job_title_norm = request.job_title.strip().lower()
+
+    jd_text, session_id, error = await load_ranking_inputs(uploaded_by, job_title_norm)
+    if error:
+        return error
+
+    loop = asyncio.get_running_loop()
+    filtered = []
+    if request.shortlist_top_k is None and request.shortlist_min_score is None:
+        total = await loop.run_in_executor(executor, db.count_session_resumes, uploaded_by, session_id)
+    else:
+        # Resumes outside the shortlist are stored as finished results, so the job never evaluates them;
+        # duplicates are set aside first so they don't take shortlist places
+        resumes = await loop.run_in_executor(executor, db.get_session_resumes, uploaded_by, session_id)
+        total = len(resumes)
+        resumes, skipped = await loop.run_in_executor(
+            executor, partition_resumes, resumes, job_title_norm, datetime.now()
+        )
+        _, filtered, _ = await apply_shortlist(request, resumes, jd_text)
+        filtered = skipped + filtered
+    job_id = await ranking_jobs.submit(
+        uploaded_by, job_title_norm, session_id, request.criteria_with_weights, total,
+        [(r.id, result) for r, result in filtered], request.scoring_mode,
+    )
+    return JSONResponse(content={"job_id": job_id, "status": "queued", "total": total}, status_code=202)
+
+
+@app.get("/rank-jobs/{job_id}")
+async def get_ranking_job(job_id: str):
+    job = await ranking_jobs.status(job_id)
+    if job is None:
+        return JSONResponse(content={"error": "Job not found"}, status_code=404)
+    return job
+
 # @app.post("/rank-resumes-dynamic/")
 # async def rank_uploaded_resumes_dynamic(request: RankRequest):
 #     criteria = [c["criterion"] for c in request.criteria_with_weights]
@@ -984,17 +1321,10 @@ async def rank_uploaded_resumes_dynamic(request: RankRequest):
 async def get_records(
     job_title: str = Query(None, description="Job title to fetch ranked resumes")
 ):
-    engine = get_db_engine()
-
     # elif job_title and not email:
     normalized_job_title = job_title.strip().lower()
-    with engine.connect() as conn:
-        result = conn.execute(text("""
-            SELECT id, email, created_at, weighted_score, uploaded_by, job_title
-            FROM CV_Ranking_User_Email
-            WHERE job_title = :job_title
-            ORDER BY weighted_score DESC
-        """), {"job_title": normalized_job_title}).mappings().all()
+    loop = asyncio.get_running_loop()
+    result = await loop.run_in_executor(executor, db.get_rankings_by_job_title, normalized_job_title)
 
     response = []
     for row in result:
@@ -1012,24 +1342,14 @@ async def get_records(
 
 @app.get("/job-titles/")
 async def get_job_titles(query: str = Query(default=None, description="Optional search query")):
-    engine = get_db_engine()
-    with engine.connect() as conn:
-        if query:
-            result = conn.execute(text("""
-                SELECT DISTINCT job_title 
-                FROM TempJobDescription 
-                WHERE job_title LIKE :query 
-                ORDER BY job_title
-            """), {"query": f"%{query.lower()}%"}).fetchall()
-        else:
-            result = conn.execute(text("""
-                SELECT DISTINCT job_title 
-                FROM TempJobDescription 
-                ORDER BY job_title
-            """)).fetchall()
-
-        job_titles = [row[0] for row in result if row[0]]
-        return {"job_titles": job_titles}
+    loop = asyncio.get_running_loop()
+    job_titles = await loop.run_in_executor(executor, db.get_job_titles, query)
+    return {"job_titles": job_titles}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
     
 from fastapi import Depends, HTTPException, Header
 from dotenv import load_dotenv
@@ -1044,16 +1364,7 @@ import os
 ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
 @app.get("/debug/all-data", dependencies=[Depends(verify_admin_token)])
 def get_all_data():
-    engine = get_db_engine()
-    with engine.connect() as conn:
-        resumes = conn.execute(text("SELECT * FROM TempResumes")).mappings().all()
-        jd = conn.execute(text("SELECT * FROM TempJobDescription")).mappings().all()
-        rankings = conn.execute(text("SELECT * FROM CV_Ranking_User_Email")).mappings().all()
-    return {
-        "TempResumes": [dict(row) for row in resumes],
-        "TempJobDescription": [dict(row) for row in jd],
-        "CV_Ranking_User_Email": [dict(row) for row in rankings],
-    }
+    return db.get_all_data()
 
 
 
@@ -1080,7 +1391,7 @@ def upload_form():
 </head>
 <body>
     <h2>Upload Resume Folder</h2>
-    <form id="resumeUploadForm" action="/upload-folder/" enctype="multipart/form-data" method="post">
+    <form id="resumeUploadForm" action="/upload-folder-stream/" enctype="multipart/form-data" method="post">
         <label>Upload by (Your Name):</label><br>
         <input type="text" name="uploaded_by" id="uploaded_by_input" required><br>
         <label>Select folder containing resumes (.pdf, .docx):</label><br>
@@ -1111,6 +1422,11 @@ def upload_form():
         <input type="hidden" id="rank_uploaded_by">
         <input type="hidden" id="rank_job_title">
         <div id="criteriaList"></div>
+        <label>Scoring:</label>
+        <select id="rank_scoring_mode">
+            <option value="llm">LLM</option>
+            <option value="keyword">Keyword (offline)</option>
+        </select><br>
         <button type="button" onclick="addCriterion()">Add Criterion</button>
         <button type="button" onclick="submitRank()">Rank Resumes</button>
     </form>
@@ -1135,13 +1451,44 @@ def upload_form():
     <ul id="jobTitlesList"></ul>
 
 <script>
+    // Calls onLine with each parsed line of an NDJSON response as it arrives
+    async function readNdjson(res, onLine) {
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            let newline;
+            while ((newline = buffer.indexOf("\\n")) >= 0) {
+                const line = buffer.slice(0, newline).trim();
+                buffer = buffer.slice(newline + 1);
+                if (line) onLine(JSON.parse(line));
+            }
+        }
+        if (buffer.trim()) onLine(JSON.parse(buffer));
+    }
+
     document.getElementById('resumeUploadForm').addEventListener('submit', async function (e) {
         e.preventDefault();
-        const formData = new FormData(this);
+        // uploaded_by goes first so the server can start storing files as they arrive
+        const formData = new FormData();
         const uploadedBy = document.getElementById("uploaded_by_input").value.trim();
+        formData.append("uploaded_by", uploadedBy);
+        for (const file of this.querySelector('input[name="files"]').files) formData.append("files", file);
+        const output = document.getElementById('resumeUploadResult');
+        output.textContent = "Uploading...";
         const res = await fetch(this.action, { method: 'POST', body: formData });
-        const result = await res.json();
-        document.getElementById('resumeUploadResult').textContent = JSON.stringify(result, null, 2);
+        if (!res.ok) {
+            output.textContent = JSON.stringify(await res.json(), null, 2);
+            return;
+        }
+        const lines = [];
+        await readNdjson(res, (item) => {
+            lines.push(item.filename ? `${item.status}: ${item.filename}` : JSON.stringify(item, null, 2));
+            output.textContent = lines.join("\\n");
+        });
         if (uploadedBy) document.getElementById("rank_uploaded_by").value = uploadedBy;
     });
 
@@ -1225,17 +1572,32 @@ def upload_form():
         const payload = {
             uploaded_by: uploadedBy,
             job_title: jobTitle,
-            criteria_with_weights: criteria_with_weights
+            criteria_with_weights: criteria_with_weights,
+            scoring_mode: document.getElementById("rank_scoring_mode").value
         };
 
         try {
-            const res = await fetch("/rank-resumes-dynamic/", {
+            resultBox.textContent = "Ranking...";
+            const res = await fetch("/rank-resumes-stream/", {
                 method: "POST",
                 headers: { "Content-Type": "application/json" },
                 body: JSON.stringify(payload)
             });
-            const result = await res.json();
-            resultBox.textContent = JSON.stringify(result, null, 2);
+            if (!res.ok) {
+                resultBox.textContent = JSON.stringify(await res.json(), null, 2);
+                return;
+            }
+            // Each resume shows up as soon as it is scored; the leaderboard replaces them at the end
+            const lines = [];
+            await readNdjson(res, (item) => {
+                if (item.ranked_resumes) {
+                    resultBox.textContent = JSON.stringify(item, null, 2);
+                    return;
+                }
+                const score = item.weighted_score !== undefined ? ` (${item.weighted_score})` : "";
+                lines.push(`${item.status}: ${item.filename}${score}`);
+                resultBox.textContent = lines.join("\\n");
+            });
         } catch (err) {
             resultBox.textContent = "Error calling API: " + err.message;
         }
@@ -1277,11 +1639,7 @@ def upload_form():
 from apscheduler.schedulers.background import BackgroundScheduler
 
 def clear_old_data():
-    engine = get_db_engine()
-    with engine.begin() as conn:
-        conn.execute(text("DELETE FROM TempResumes"))
-        conn.execute(text("DELETE FROM TempJobDescription"))
-        conn.execute(text("DELETE FROM CV_Ranking_User_Email"))
+    db.clear_all_data()
     print("[INFO] Database cleared as part of monthly cleanup.")
 
 def schedule_monthly_cleanup():
@@ -1294,6 +1652,24 @@ def schedule_monthly_cleanup():
 def on_startup():
     schedule_monthly_cleanup()
     initialize_database() 
+
+
+@app.on_event("startup")
+async def resume_ranking_jobs():
+    try:
+        get_scorer().open()
+    except Exception as e:
+        # e.g. no AZURE_OPENAI_* credentials: the rest of the app still works and
+        # LLM scoring requests report the error when they try to open the client
+        print(f"[WARN] Could not set up the scoring backend: {e}")
+    await ranking_jobs.resume_unfinished()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    extraction_engine.shutdown()
+    await close_scorer()
+    tracing.flush()
 # === Monthly Cleanup Logic Ends Here ===
 
 
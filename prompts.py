@@ -0,0 +1,166 @@
+import os
+from dataclasses import dataclass
+
+from metrics import registry
+
+# Versioned prompt templates for resume evaluation.
+#
+# Providers cache prompts by exact prefix, so the current layout keeps
+# everything that repeats in front: the fixed instructions (system message),
+# then the JD, then the criteria, with the resume last. Every evaluation in a
+# ranking run then shares the same prefix up to the resume text.
+#
+# Templates are str.format strings; a change to any of them needs a new
+# version, since cached evaluations are keyed by PROMPT_VERSION.
+
+SCORING_RULES = """
+            
+            JSON Output Rules:
+            - Return ALL criteria, even if score = 0.
+            - For each criterion:
+            - **score**: integer (0–100)
+            - **comment**: must reference exact resume snippets or state "No evidence"
+            - Always include "summary_comment".
+
+            
+            Scoring Guide (JD-Aware):
+            - 90–100: Resume clearly meets or exceeds the JD’s required experience and responsibilities for this criterion.
+            - 70–89: Resume provides good but slightly below JD requirement (some evidence but not full alignment).
+            - 50–69: Resume shows partial alignment, but below JD expectations.
+            - 20–49: Very weak evidence, vague mentions, or does not meet JD requirement.
+            - 0–19: No evidence at all in the resume.
+
+            Rules:
+            - Do not assume skills unless explicitly in the resume.
+            - Penalize vague terms like "familiar with", "basic knowledge".
+            - Score only in relation to how well the resume aligns with the JD’s stated requirement.
+            - Comments must quote supporting resume text if possible.
+
+"""
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    version: str
+    system: str
+    user: str        # fields: jd_text, criteria, resume_text
+    batch_user: str  # fields: jd_text, criteria, candidates
+
+    def _messages(self, user_content):
+        messages = []
+        if self.system:
+            messages.append({"role": "system", "content": self.system})
+        messages.append({"role": "user", "content": user_content})
+        return messages
+
+    def messages(self, resume_text, jd_text, criteria_list):
+        return self._messages(self.user.format(
+            jd_text=jd_text, criteria=", ".join(criteria_list), resume_text=resume_text,
+        ))
+
+    def batch_messages(self, resume_texts, jd_text, criteria_list):
+        """`resume_texts` maps candidate id to resume text."""
+        candidates = "\n\n".join(
+            f"Candidate {candidate_id}:\n{text}" for candidate_id, text in resume_texts.items()
+        )
+        return self._messages(self.batch_user.format(
+            jd_text=jd_text, criteria=", ".join(criteria_list), candidates=candidates,
+        ))
+
+
+PROMPTS = {
+    # Original layout: criteria in the first line, resume before the JD
+    "1": PromptTemplate(
+        version="1",
+        system="",
+        user="You are a **strict hiring evaluator**. Compare the RESUME against the JOB DESCRIPTION using the criteria: {criteria}." + SCORING_RULES + """
+Resume:
+{resume_text}
+
+Job Description:
+{jd_text}
+
+Return a JSON object with:
+- For each criterion: a score (0–100) and a brief explanation.
+- A 'summary_comment' with an overall evaluation.""",
+        batch_user="""You are a **strict hiring evaluator**. Compare EACH candidate's RESUME against the JOB DESCRIPTION using the criteria: {criteria}.
+Score every candidate on their own resume only; never compare candidates with each other.""" + SCORING_RULES + """
+Job Description:
+{jd_text}
+
+{candidates}
+
+Return a JSON object with one entry per candidate id, each holding:
+- For each criterion: a score (0–100) and a brief explanation.
+- A 'summary_comment' with an overall evaluation.""",
+    ),
+    # Fixed prefix: instructions, JD, criteria, then the resume(s)
+    "2": PromptTemplate(
+        version="2",
+        system="""You are a **strict hiring evaluator**. Compare the RESUME against the JOB DESCRIPTION using the criteria listed with it.
+When several candidates are given, score every candidate on their own resume only; never compare candidates with each other.""" + SCORING_RULES + """
+Return a JSON object with:
+- For each criterion: a score (0–100) and a brief explanation.
+- A 'summary_comment' with an overall evaluation.
+When several candidates are given, return one such object per candidate id.""",
+        user="""Job Description:
+{jd_text}
+
+Criteria: {criteria}
+
+Resume:
+{resume_text}""",
+        batch_user="""Job Description:
+{jd_text}
+
+Criteria: {criteria}
+
+{candidates}""",
+    ),
+}
+
+PROMPT_VERSION = os.getenv("PROMPT_VERSION", "2")
+if PROMPT_VERSION not in PROMPTS:
+    raise ValueError(f"Unknown PROMPT_VERSION {PROMPT_VERSION!r}; available: {', '.join(PROMPTS)}")
+
+
+def get_prompt(version=None):
+    return PROMPTS[version or PROMPT_VERSION]
+
+
+class PromptUsage:
+    """Token usage reported by the API, to watch prompt-cache reuse."""
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+
+    def record(self, usage):
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = (getattr(details, "cached_tokens", None) or 0) if details is not None else 0
+        self.calls += 1
+        self.prompt_tokens += usage.prompt_tokens or 0
+        self.cached_tokens += cached
+        self.completion_tokens += usage.completion_tokens or 0
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_ratio": round(self.cached_tokens / self.prompt_tokens, 4) if self.prompt_tokens else 0.0,
+        }
+
+
+prompt_usage = PromptUsage()
+
+registry.counter("llm_tokens_total", "Tokens reported by the API; cached is part of prompt", ("type",), fn=lambda: {
+    "prompt": prompt_usage.prompt_tokens,
+    "cached": prompt_usage.cached_tokens,
+    "completion": prompt_usage.completion_tokens,
+})
@@ -149,10 +149,14 @@
 
 
 import json
-from openai import AzureOpenAI
+import httpx
+from openai import AsyncAzureOpenAI
 from dotenv import load_dotenv
 import os
 import html
+from metrics import registry
+from prompts import get_prompt, prompt_usage
+from tracing import span
 
 # Load environment variables
 load_dotenv()
@@ -162,58 +166,81 @@ AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
 AZURE_OPENAI_DEPLOYMENT_NAME = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
 OPENAI_API_VERSION = os.getenv("OPENAI_API_VERSION")
 
+# One long-lived client per scorer (scorers.py): connections are kept alive and
+# reused across evaluations instead of a TLS handshake per resume.
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "30"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+
+# Rough token estimate for rate limiting: ~4 characters per token for the
+# prompt, plus the instructions, function schema and the expected answer
+CHARS_PER_TOKEN = 4
+PROMPT_OVERHEAD_TOKENS = 500
+COMPLETION_TOKENS_PER_CRITERION = 60
+COMPLETION_TOKENS_SUMMARY = 120
+
+
+def estimate_tokens(resume_text, jd_text, criteria_list):
+    """Approximate prompt + completion tokens one evaluation will use."""
+    return estimate_batch_tokens([resume_text], jd_text, criteria_list)
+
+
+def estimate_batch_tokens(resume_texts, jd_text, criteria_list):
+    """Same as estimate_tokens for several resumes sharing one prompt: the JD and instructions are sent once."""
+    # The criteria appear in the instructions and again in each candidate's schema
+    criteria_chars = sum(len(c) for c in criteria_list) * (2 + len(resume_texts))
+    prompt_chars = sum(len(t) for t in resume_texts) + len(jd_text) + criteria_chars
+    return (
+        PROMPT_OVERHEAD_TOKENS
+        + prompt_chars // CHARS_PER_TOKEN
+        + (COMPLETION_TOKENS_PER_CRITERION * len(criteria_list) + COMPLETION_TOKENS_SUMMARY) * len(resume_texts)
+    )
 
 
-def get_relevance_score(resume_text, jd_text, criteria_list):
-    client = AzureOpenAI(
-        azure_endpoint=AZURE_OPENAI_ENDPOINT,
-        api_key=AZURE_OPENAI_API_KEY,
-        api_version=OPENAI_API_VERSION,
+def create_llm_client(transport=None, endpoint=AZURE_OPENAI_ENDPOINT, api_key=AZURE_OPENAI_API_KEY,
+                      api_version=OPENAI_API_VERSION):
+    """AsyncAzureOpenAI on a pooled httpx client; `transport` stands in for the network (see fake_openai.py)."""
+    http_client = httpx.AsyncClient(
+        transport=transport,
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_CONNECTIONS,
+            keepalive_expiry=LLM_KEEPALIVE_SECONDS,
+        ),
+        # pool=None: requests beyond max_connections queue for a connection
+        timeout=httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=10.0, pool=None),
+    )
+    return AsyncAzureOpenAI(
+        azure_endpoint=endpoint,
+        api_key=api_key,
+        api_version=api_version,
+        max_retries=0,  # retries and backoff are handled by llm_scheduler
+        http_client=http_client,
     )
-    
-    print("criteria_list----------------------",criteria_list)
-    # normalized_criteria = [criterion.lower() for criterion in criteria_list]
-    # Compose the system/user message
-    messages = [
-        {
-           "role": "user",
-            "content": f"""You are a **strict hiring evaluator**. Compare the RESUME against the JOB DESCRIPTION using the criteria: {', '.join(criteria_list)}.
-            
-            JSON Output Rules:
-            - Return ALL criteria, even if score = 0.
-            - For each criterion:
-            - **score**: integer (0–100)
-            - **comment**: must reference exact resume snippets or state "No evidence"
-            - Always include "summary_comment".
 
-            
-            Scoring Guide (JD-Aware):
-            - 90–100: Resume clearly meets or exceeds the JD’s required experience and responsibilities for this criterion.
-            - 70–89: Resume provides good but slightly below JD requirement (some evidence but not full alignment).
-            - 50–69: Resume shows partial alignment, but below JD expectations.
-            - 20–49: Very weak evidence, vague mentions, or does not meet JD requirement.
-            - 0–19: No evidence at all in the resume.
 
-            Rules:
-            - Do not assume skills unless explicitly in the resume.
-            - Penalize vague terms like "familiar with", "basic knowledge".
-            - Score only in relation to how well the resume aligns with the JD’s stated requirement.
-            - Comments must quote supporting resume text if possible.
+llm_parse_failures = registry.counter(
+    "llm_parse_failures_total", "LLM answers without valid JSON function arguments", ("function",),
+)
 
 
-Resume:
-{resume_text}
+def parse_function_arguments(response, function_name):
+    """The JSON arguments of the response's function call; counts and re-raises failures."""
+    try:
+        return json.loads(response.choices[0].message.function_call.arguments)
+    except (AttributeError, TypeError, ValueError):
+        llm_parse_failures.inc(function=function_name)
+        raise
 
-Job Description:
-{jd_text}
 
-Return a JSON object with:
-- For each criterion: a score (0–100) and a brief explanation.
-- A 'summary_comment' with an overall evaluation.""" 
-        }
-    ]
+def record_usage(current_span, usage):
+    """Token counts of a response as attributes of its span."""
+    if usage is not None:
+        current_span.set(prompt_tokens=usage.prompt_tokens or 0, completion_tokens=usage.completion_tokens or 0)
 
-    # Build dynamic JSON schema for OpenAI function
+
+def criteria_schema(criteria_list):
+    """Function-schema properties for one evaluation: each criterion plus summary_comment."""
     criteria_properties = {
         criterion: {
             "type": "object",
@@ -237,6 +264,33 @@ Return a JSON object with:
         "type": "string",
         "description": "Overall summary of how the resume matches the JD"
     }
+    return criteria_properties
+
+
+def is_valid_evaluation(result, criteria_list):
+    """True when every criterion has an integer 0-100 score and a comment (keys matched like evaluate_resume does)."""
+    if not isinstance(result, dict):
+        return False
+    entries = {key.strip(".").lower(): value for key, value in result.items()}
+    for criterion in criteria_list:
+        entry = entries.get(criterion.strip(".").lower())
+        if not isinstance(entry, dict):
+            return False
+        score = entry.get("score")
+        if isinstance(score, bool) or not isinstance(score, int) or not 0 <= score <= 100:
+            return False
+        if not isinstance(entry.get("comment"), str):
+            return False
+    return True
+
+
+async def get_relevance_score(resume_text, jd_text, criteria_list, client, model=AZURE_OPENAI_DEPLOYMENT_NAME):
+    # normalized_criteria = [criterion.lower() for criterion in criteria_list]
+    # Compose the system/user message (see prompts.py)
+    messages = get_prompt().messages(resume_text, jd_text, criteria_list)
+
+    # Build dynamic JSON schema for OpenAI function
+    criteria_properties = criteria_schema(criteria_list)
 
     function_schema = {
         "name": "evaluate_resume",
@@ -249,23 +303,63 @@ Return a JSON object with:
     }
 
     # Call OpenAI chat with function schema
-    response = client.chat.completions.create(
-        model=AZURE_OPENAI_DEPLOYMENT_NAME,
-        messages=messages,
-        functions=[function_schema],
-        function_call={"name": "evaluate_resume"},
-        temperature=0,
-    )
-
-    # Parse function response JSON
-    args_json = response.choices[0].message.function_call.arguments
-    result = json.loads(args_json)
-    
-    print("Evaluation Result:", result)
+    with span("llm.evaluate_resume", model=model, criteria=len(criteria_list)) as current:
+        response = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            functions=[function_schema],
+            function_call={"name": "evaluate_resume"},
+            temperature=0,
+        )
+        prompt_usage.record(response.usage)
+        record_usage(current, response.usage)
+
+        # Parse function response JSON
+        result = parse_function_arguments(response, "evaluate_resume")
 
     return result
 
 
+async def get_relevance_scores_batch(resume_texts, jd_text, criteria_list, client, model=AZURE_OPENAI_DEPLOYMENT_NAME):
+    """
+    Score several resumes against one JD in a single call.
+
+    `resume_texts` maps candidate id to resume text; returns the parsed
+    function arguments, one evaluation object per candidate id. Callers
+    validate each entry with is_valid_evaluation.
+    """
+    messages = get_prompt().batch_messages(resume_texts, jd_text, criteria_list)
+
+    criteria_properties = criteria_schema(criteria_list)
+    function_schema = {
+        "name": "evaluate_resumes",
+        "description": "Evaluate several resumes against the job description using criteria.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                candidate_id: {
+                    "type": "object",
+                    "properties": criteria_properties,
+                    "required": list(criteria_list) + ["summary_comment"]
+                } for candidate_id in resume_texts
+            },
+            "required": list(resume_texts)
+        }
+    }
+
+    with span("llm.evaluate_resumes", model=model, criteria=len(criteria_list), resumes=len(resume_texts)) as current:
+        response = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            functions=[function_schema],
+            function_call={"name": "evaluate_resumes"},
+            temperature=0,
+        )
+        prompt_usage.record(response.usage)
+        record_usage(current, response.usage)
+        return parse_function_arguments(response, "evaluate_resumes")
+
+
 
 # def calculate_weighted_score_manual(evaluation_result, criteria_with_weights):
 #     criteria = [item["criterion"] for item in criteria_with_weights]
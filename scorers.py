@@ -0,0 +1,106 @@
+import os
+from abc import ABC, abstractmethod
+
+from rank import AZURE_OPENAI_DEPLOYMENT_NAME, create_llm_client, get_relevance_score, get_relevance_scores_batch
+
+# The model behind resume evaluation. Everything that scores a resume goes
+# through get_scorer(), so the backend is picked in one place:
+#   azure - the Azure OpenAI deployment configured by the AZURE_OPENAI_* settings
+#   fake  - the in-process stand-in from fake_openai.py (FAKE_LLM_* settings),
+#           for performance tests without a network or a deployment
+SCORER_BACKEND = os.getenv("SCORER_BACKEND", "azure")
+
+
+class Scorer(ABC):
+    """
+    Interface of a scoring backend. `name` identifies the model in cache
+    keys, so answers from different backends are never mixed up.
+    """
+
+    name = ""
+
+    @abstractmethod
+    async def score(self, resume_text, jd_text, criteria_list):
+        """One evaluation: {criterion: {"score", "comment"}, ..., "summary_comment"}."""
+
+    @abstractmethod
+    async def score_batch(self, resume_texts, jd_text, criteria_list):
+        """Evaluations for {candidate id: resume text}, keyed by candidate id."""
+
+    def open(self):
+        """Set up connections ahead of the first call."""
+
+    async def close(self):
+        pass
+
+
+class AzureScorer(Scorer):
+    """Azure OpenAI chat completions with function calling, over one pooled client."""
+
+    def __init__(self, deployment=AZURE_OPENAI_DEPLOYMENT_NAME, transport=None, **client_options):
+        self.name = f"azure:{deployment}"
+        self.deployment = deployment
+        self.transport = transport
+        self.client_options = client_options
+        self._client = None
+
+    def open(self):
+        if self._client is None:
+            self._client = create_llm_client(self.transport, **self.client_options)
+        return self._client
+
+    async def score(self, resume_text, jd_text, criteria_list):
+        return await get_relevance_score(resume_text, jd_text, criteria_list, self.open(), self.deployment)
+
+    async def score_batch(self, resume_texts, jd_text, criteria_list):
+        return await get_relevance_scores_batch(resume_texts, jd_text, criteria_list, self.open(), self.deployment)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+class FakeScorer(AzureScorer):
+    """The Azure client against fake_openai's in-process endpoint: same protocol, errors and retries."""
+
+    def __init__(self, fake=None):
+        from fake_openai import FakeAzureTransport
+
+        transport = FakeAzureTransport(fake)
+        super().__init__(deployment="fake", transport=transport, endpoint="https://fake.openai.azure.com",
+                         api_key="fake", api_version="2024-06-01")
+        self.name = "fake"
+        self.fake = transport.fake
+
+
+SCORERS = {
+    "azure": AzureScorer,
+    "fake": FakeScorer,
+}
+if SCORER_BACKEND not in SCORERS:
+    raise ValueError(f"Unknown SCORER_BACKEND {SCORER_BACKEND!r}; available: {', '.join(SCORERS)}")
+
+_scorer = None
+
+
+def get_scorer():
+    global _scorer
+    if _scorer is None:
+        _scorer = SCORERS[SCORER_BACKEND]()
+        print(f"[INFO] Scoring with the {_scorer.name} backend")
+    return _scorer
+
+
+def set_scorer(scorer):
+    """Swap the backend at runtime (benchmarks, tests); returns the previous one."""
+    global _scorer
+    previous, _scorer = _scorer, scorer
+    return previous
+
+
+async def close_scorer():
+    global _scorer
+    if _scorer is not None:
+        await _scorer.close()
+        _scorer = None
@@ -0,0 +1,76 @@
+import math
+import os
+import re
+from collections import Counter
+
+# Lexical pre-ranking: an in-memory BM25 index over a session's resumes,
+# queried with the JD text plus the criteria, so only the most relevant
+# resumes are sent to the LLM.
+BM25_K1 = float(os.getenv("BM25_K1", "1.5"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+# Criteria terms count this many times as much as JD terms in the query
+SHORTLIST_CRITERIA_BOOST = float(os.getenv("SHORTLIST_CRITERIA_BOOST", "3"))
+
+# Keeps tech tokens like ".net", "c++", "c#" and versions like "3.11" whole; a dot
+# before a letter starts a new token, so "c#.net" is "c#" ".net" and "asp.net" is "asp" ".net"
+_TOKEN = re.compile(r"\.?[a-z0-9][a-z0-9+#]*(?:\.[0-9][a-z0-9+#]*)*")
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the their this to was
+were will with we you your our i me my not but if into than then they them he she his her
+""".split())
+
+
+def tokenize(text):
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    def __init__(self, documents, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.term_counts = [Counter(tokenize(doc)) for doc in documents]
+        self.lengths = [sum(counts.values()) for counts in self.term_counts]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        document_frequency = Counter()
+        for counts in self.term_counts:
+            document_frequency.update(counts.keys())
+        n = len(documents)
+        self.idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in document_frequency.items()
+        }
+
+    def scores(self, query_weights):
+        """BM25 score of every document for {term: weight}."""
+        results = []
+        for counts, length in zip(self.term_counts, self.lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / self.avg_length) if self.avg_length else self.k1
+            score = 0.0
+            for term, weight in query_weights.items():
+                tf = counts.get(term)
+                if tf:
+                    score += weight * self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            results.append(score)
+        return results
+
+
+def build_query(jd_text, criteria_list, criteria_boost=SHORTLIST_CRITERIA_BOOST):
+    weights = Counter(set(tokenize(jd_text)))
+    for criterion in criteria_list:
+        for term in set(tokenize(criterion)):
+            weights[term] += criteria_boost
+    return dict(weights)
+
+
+def shortlist(documents, jd_text, criteria_list, top_k=None, min_score=None):
+    """
+    Returns (selected, scores): the indexes of the documents to send to the
+    LLM, best first, and every document's lexical score. A document must be
+    within top_k and reach min_score when those are given.
+    """
+    scores = BM25Index(documents).scores(build_query(jd_text, criteria_list))
+    order = sorted(range(len(documents)), key=lambda i: scores[i], reverse=True)
+    if min_score is not None:
+        order = [i for i in order if scores[i] >= min_score]
+    if top_k is not None:
+        order = order[:top_k]
+    return order, scores
@@ -0,0 +1,376 @@
+import argparse
+import atexit
+import contextvars
+import functools
+import json
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import route_path
+
+# Request-scoped tracing. A span is opened per request by TracingMiddleware
+# and per stage inside it; the current span lives in a contextvar, so it
+# follows asyncio tasks, TracingThreadPoolExecutor threads and, through
+# run_in_span, extraction worker processes. Finished spans are exported in
+# batches from a background thread:
+#   TRACE_EXPORT=jsonl  one JSON object per line in TRACE_EXPORT_PATH
+#   TRACE_EXPORT=otlp   OTLP/HTTP JSON to TRACE_OTLP_ENDPOINT (a collector, or
+#                       the stand-in: python tracing.py --port 4318)
+# With TRACE_EXPORT unset no spans are recorded, but every response still
+# carries an X-Trace-Id header (taken from the request when it sends one).
+TRACE_EXPORT = os.getenv("TRACE_EXPORT", "")
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "traces.jsonl")
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "http://127.0.0.1:4318/v1/traces")
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "resume-ranker")
+TRACE_HEADER = "X-Trace-Id"
+
+_TRACE_ID = re.compile(r"^[0-9a-f]{32}$")
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attributes", "start_ns", "end_ns", "error")
+
+    def __init__(self, name, trace_id, parent_id=None, attributes=None):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def context(self):
+        """(trace_id, span_id): what a child in another process needs."""
+        return self.trace_id, self.span_id
+
+    def as_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            "pid": os.getpid(),
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    def set(self, **attributes):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+# --- Exporters ---
+
+class _BatchExporter(ABC):
+    """Queues finished spans; a daemon thread writes them out every second or every `batch_size`."""
+
+    def __init__(self, batch_size=256, interval=1.0):
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def export(self, span):
+        self._queue.put(span)
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name="trace-exporter", daemon=True)
+                    self._thread.start()
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            while True:
+                spans = []
+                while len(spans) < self.batch_size:
+                    try:
+                        spans.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not spans:
+                    return
+                try:
+                    self._write(spans)
+                except Exception as e:
+                    print(f"[WARN] Could not export {len(spans)} spans: {e}")
+
+    @abstractmethod
+    def _write(self, spans):
+        """Send one batch of finished spans; runs on the export thread."""
+
+
+class JsonlExporter(_BatchExporter):
+    def __init__(self, path=TRACE_EXPORT_PATH, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+
+    def _write(self, spans):
+        # One write per batch; appends from several processes stay line-aligned
+        data = "".join(json.dumps(s.as_dict(), default=str) + "\n" for s in spans)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(data)
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(spans, service_name=TRACE_SERVICE_NAME):
+    """An OTLP/HTTP JSON ExportTraceServiceRequest for the spans."""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+        "scopeSpans": [{
+            "scope": {"name": service_name},
+            "spans": [{
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                "parentSpanId": s.parent_id or "",
+                "name": s.name,
+                "kind": 1,
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns),
+                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()]
+                + [{"key": "process.pid", "value": _otlp_value(os.getpid())}],
+                "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+            } for s in spans],
+        }],
+    }]}
+
+
+class OtlpExporter(_BatchExporter):
+    def __init__(self, endpoint=TRACE_OTLP_ENDPOINT, **kwargs):
+        super().__init__(**kwargs)
+        self.endpoint = endpoint
+        self._client = None
+
+    def _write(self, spans):
+        import httpx
+
+        if self._client is None:
+            self._client = httpx.Client(timeout=5.0)
+        self._client.post(self.endpoint, json=to_otlp(spans)).raise_for_status()
+
+
+EXPORTERS = {"jsonl": JsonlExporter, "otlp": OtlpExporter}
+if TRACE_EXPORT and TRACE_EXPORT not in EXPORTERS:
+    raise ValueError(f"Unknown TRACE_EXPORT {TRACE_EXPORT!r}; available: {', '.join(EXPORTERS)}")
+
+exporter = EXPORTERS[TRACE_EXPORT]() if TRACE_EXPORT else None
+if exporter is not None:
+    atexit.register(exporter.flush)
+
+
+# --- Spans ---
+
+def current_span():
+    return _current.get()
+
+
+def current_trace_id():
+    span = _current.get()
+    return span.trace_id if span is not None else None
+
+
+def new_trace_id(requested=None):
+    """The caller's trace id when it is a valid one, else a new one."""
+    if requested and _TRACE_ID.match(requested.lower()):
+        return requested.lower()
+    return secrets.token_hex(16)
+
+
+class span:
+    """
+    Context manager opening a child of the current span (or a new trace with
+    root=True, or under `parent`, a (trace_id, span_id) from another process).
+    Yields the span, or a no-op stand-in when tracing is off.
+    """
+
+    __slots__ = ("name", "attributes", "root", "parent", "trace_id", "_span", "_token")
+
+    def __init__(self, name, root=False, parent=None, trace_id=None, **attributes):
+        self.name = name
+        self.attributes = attributes
+        self.root = root
+        self.parent = parent
+        self.trace_id = trace_id
+        self._span = None
+        self._token = None
+
+    def __enter__(self):
+        if exporter is None and self.trace_id is None:
+            return _NOOP
+        if self.parent is not None:
+            trace_id, parent_id = self.parent
+        else:
+            current = None if self.root else _current.get()
+            if current is not None:
+                trace_id, parent_id = current.trace_id, current.span_id
+            else:
+                trace_id, parent_id = self.trace_id or new_trace_id(), None
+        self._span = Span(self.name, trace_id, parent_id, self.attributes)
+        self._token = _current.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._span is None:
+            return False
+        _current.reset(self._token)
+        self._span.end_ns = time.time_ns()
+        if exc is not None:
+            self._span.error = f"{exc_type.__name__}: {exc}"
+        if exporter is not None:
+            exporter.export(self._span)
+        return False
+
+
+def flush():
+    """Export everything finished so far (called on shutdown)."""
+    if exporter is not None:
+        exporter.flush()
+
+
+def run_in_span(parent, name, fn, *args):
+    """Call fn(*args) under a span whose parent lives in another process; picklable as a partial."""
+    with span(name, parent=parent):
+        result = fn(*args)
+    flush()  # pool workers exit without running atexit handlers
+    return result
+
+
+def propagate(fn):
+    """fn wrapped to run under a child of the current span in another process (picklable), or fn itself."""
+    current = _current.get()
+    if current is None or exporter is None:
+        return fn
+    return functools.partial(run_in_span, current.context, f"{fn.__module__}.{fn.__name__}", fn)
+
+
+def _run_queued(submitted_ns, fn, *args, **kwargs):
+    if _current.get() is None or exporter is None:
+        return fn(*args, **kwargs)
+    name = f"{getattr(fn, '__module__', '') or ''}.{getattr(fn, '__name__', 'call')}".lstrip(".")
+    with span(name, queue_ms=round((time.time_ns() - submitted_ns) / 1e6, 3)):
+        return fn(*args, **kwargs)
+
+
+class TracingThreadPoolExecutor(ThreadPoolExecutor):
+    """
+    ThreadPoolExecutor that runs each call in the submitter's context, so
+    loop.run_in_executor keeps the current span, and records a span per call
+    with the time it waited for a thread (queue_ms).
+    """
+
+    def submit(self, fn, *args, **kwargs):
+        context = contextvars.copy_context()
+        return super().submit(context.run, _run_queued, time.time_ns(), fn, *args, **kwargs)
+
+
+class TracingMiddleware:
+    """ASGI middleware: a root span per request and the X-Trace-Id response header."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        requested = None
+        for key, value in scope.get("headers", ()):
+            if key == b"x-trace-id":
+                requested = value.decode("latin-1")
+                break
+        trace_id = new_trace_id(requested)
+
+        with span("HTTP " + scope["method"], trace_id=trace_id, root=True, **{"http.method": scope["method"]}) as root:
+            async def send_with_trace_id(message):
+                if message["type"] == "http.response.start":
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [
+                        (TRACE_HEADER.lower().encode("latin-1"), trace_id.encode("latin-1")),
+                    ]
+                    root.set(**{"http.status_code": message["status"]})
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_trace_id)
+            finally:
+                path = route_path(scope)
+                if isinstance(root, Span):
+                    root.name = f"HTTP {scope['method']} {path}"
+                root.set(**{"http.route": path})
+
+
+# --- Collector stand-in ---
+
+def create_collector_app(path):
+    """FastAPI app accepting OTLP/HTTP JSON on /v1/traces and appending the spans to `path` as JSON lines."""
+    from fastapi import FastAPI, Request
+
+    app = FastAPI(title="Trace collector")
+    lock = threading.Lock()
+
+    @app.post("/v1/traces")
+    async def collect(request: Request):
+        body = await request.json()
+        lines = []
+        for resource in body.get("resourceSpans", []):
+            for scope_spans in resource.get("scopeSpans", []):
+                for s in scope_spans.get("spans", []):
+                    attributes = {a["key"]: next(iter(a["value"].values()), None) for a in s.get("attributes", [])}
+                    start, end = int(s["startTimeUnixNano"]), int(s["endTimeUnixNano"])
+                    lines.append(json.dumps({
+                        "trace_id": s["traceId"], "span_id": s["spanId"], "parent_id": s.get("parentSpanId") or None,
+                        "name": s["name"], "start_ns": start, "end_ns": end,
+                        "duration_ms": round((end - start) / 1e6, 3),
+                        "status": "error" if s.get("status", {}).get("code") == 2 else "ok",
+                        "error": s.get("status", {}).get("message"), "attributes": attributes,
+                    }) + "\n")
+        with lock, open(path, "a", encoding="utf-8") as f:
+            f.write("".join(lines))
+        return {"partialSuccess": {}}
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Minimal OTLP/HTTP JSON trace collector writing JSON lines.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--out", default="collected_traces.jsonl")
+    args = parser.parse_args()
+    uvicorn.run(create_collector_app(args.out), host=args.host, port=args.port)